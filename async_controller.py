@@ -0,0 +1,132 @@
+# async_controller.py
+import argparse
+import asyncio
+import random
+
+from elevator import Elevator
+from sim_clock import SimClock
+
+# Asyncio front end for a headless Elevator (or Bank).
+# Hall calls and panel presses are put on queues by any number of producer tasks while the elevator runs.
+# The controller loop drains the queues between simulation events, so a call that lands mid-sweep gets picked
+# up on the way if the elevator hasn't passed it yet.
+
+
+class AsyncController:
+    def __init__(self, elevator):
+        self.elevator = elevator
+        self.elevator.interactive = False
+        # The controller paces the clock itself with asyncio.sleep, so a real time clock never blocks the producers
+        self.real_time = elevator.clock.real_time
+        self.elevator.clock.real_time = 0.0
+
+        self.calls = asyncio.Queue() # (floor, direction)
+        self.presses = asyncio.Queue() # (floor, car)
+        self._arrived = asyncio.Event()
+        self._closed = False
+
+    #### Public Functions ####
+    async def call(self, floor: int, direction: str):
+        # Checked here so the producer that sent it gets the error, not the controller loop
+        config = self.elevator.config
+        if not config.min_floor <= floor <= config.max_floor:
+            raise ValueError(f"Call floor must be between {config.min_floor} - {config.max_floor}, got {floor}")
+        if direction.upper() not in ("UP", "DOWN"):
+            raise ValueError(f"Call direction must be 'UP' or 'DOWN', got {direction!r}")
+        await self.calls.put((floor, direction))
+        self._arrived.set()
+
+    async def press(self, floor: int, car: int = 0):
+        # Checked here so the producer that sent it gets the error, not the controller loop
+        cars = len(getattr(self.elevator, "cars", [self.elevator]))
+        if not 0 <= car < cars:
+            raise ValueError(f"Car must be between 0 - {cars - 1}, got {car}")
+        await self.presses.put((floor, car))
+        self._arrived.set()
+
+    def close(self):
+        """Description: No more calls are coming. run() returns once everything queued has been answered"""
+        self._closed = True
+        self._arrived.set()
+
+    async def run(self):
+        clock = self.elevator.clock
+        self.elevator.more_calls_coming = True
+        self.elevator.start()
+
+        while True:
+            self._drain_queues()
+            next_time = clock.next_time()
+
+            if next_time is None:
+                if self._closed and self.calls.empty() and self.presses.empty():
+                    break
+                # Idle until a producer sends something
+                await self._wait_for_arrival(None)
+                continue
+
+            if self.real_time > 0 and next_time > clock.now:
+                waited = await self._wait_for_arrival((next_time - clock.now) * self.real_time)
+                if waited is not None:
+                    # Something came in before the next event. Catch the clock up to when it arrived and apply it
+                    clock.run(until=min(next_time, clock.now + waited / self.real_time))
+                    continue
+            else:
+                # Give the producers a turn even when running as fast as possible
+                await asyncio.sleep(0)
+
+            clock.run(until=next_time)
+
+        # Let the elevator finish up and head back to the ground floor
+        self.elevator.calls_finished()
+        clock.run()
+
+    #### Private functions ####
+    def _drain_queues(self):
+        while not self.calls.empty():
+            floor, direction = self.calls.get_nowait()
+            self.elevator.register_call(floor, direction)
+        while not self.presses.empty():
+            floor, car = self.presses.get_nowait()
+            self.elevator.press_button(floor, car)
+
+    async def _wait_for_arrival(self, timeout):
+        """Description: Wait up to 'timeout' wall seconds (forever if None) for a producer.
+        Returns how long it waited if something arrived, None if it timed out"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await asyncio.wait_for(self._arrived.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._arrived.clear()
+        return loop.time() - start
+
+
+async def _random_caller(controller, config, calls: int, pause: float, seed: int):
+    rng = random.Random(seed)
+    for _ in range(calls):
+        await asyncio.sleep(rng.uniform(0, pause))
+        await controller.call(rng.randint(config.min_floor, config.max_floor), rng.choice(("UP", "DOWN")))
+        if rng.random() < 0.5:
+            await controller.press(rng.randint(config.min_floor, config.max_floor))
+
+
+async def _demo(producers: int, calls: int, real_time: float, seed: int):
+    elevator = Elevator(SimClock(real_time=real_time), interactive=False, seed=seed)
+    controller = AsyncController(elevator)
+    runner = asyncio.create_task(controller.run())
+    await asyncio.gather(*(_random_caller(controller, elevator.config, calls, 0.05, seed + i) for i in range(producers)))
+    controller.close()
+    await runner
+    print(f"All calls answered after {elevator.clock.now:.1f} simulated seconds")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Elevator fed by concurrent asyncio producers")
+    parser.add_argument("--producers", type=int, default=3)
+    parser.add_argument("--calls", type=int, default=10, help="calls per producer")
+    parser.add_argument("--real-time", type=float, default=0.01, help="wall clock seconds per simulated second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(_demo(args.producers, args.calls, args.real_time, args.seed))
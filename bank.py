@@ -0,0 +1,242 @@
+# bank.py
+from bisect import bisect_left, bisect_right, insort
+
+from elevator import CONFIG, PASSENGER, Elevator
+from event_log import EventLog
+from floor_index import FloorSet
+from passenger_generator import PassengerGenerator
+from sim_clock import SimClock
+
+# A bank of elevators sharing one set of outside call buttons.
+# Each call is handed to the closest car that's heading the right way. To keep that cheap with lots of cars,
+# the bank keeps every car's floor in a sorted list per direction, so finding a candidate is a binary search
+# instead of a scan over every car. Cars too full to stop for calls (Elevator.has_room) are kept in a list of
+# their own and only get a call when every car is full.
+#
+# With a policy that assigns by destination (policies.DestinationDispatch) there's no shared table - each caller is
+# given a car of their own and waits for that car, so every car keeps its own calls and the riders waiting on them.
+
+DIRECTIONS = ("UP", "DOWN", "IDLE", "FULL")
+
+
+class CarIndex:
+    """Description: Sorted (floor, car_number) lists for cars going up, going down, sitting idle and too full for calls"""
+
+    def __init__(self):
+        self.cars = {direction: [] for direction in DIRECTIONS}
+        self.positions = {} # car_number -> (direction, floor) currently in the index
+
+    def update(self, car_number: int, direction: str, floor: int):
+        old = self.positions.get(car_number)
+        if old == (direction, floor):
+            return
+        if old:
+            self._remove(car_number, *old)
+        insort(self.cars[direction], (floor, car_number))
+        self.positions[car_number] = (direction, floor)
+
+    def nearest_at_or_below(self, direction: str, floor: int):
+        cars = self.cars[direction]
+        i = bisect_right(cars, (floor, float("inf")))
+        return cars[i - 1] if i > 0 else None
+
+    def nearest_at_or_above(self, direction: str, floor: int):
+        cars = self.cars[direction]
+        i = bisect_left(cars, (floor, -1))
+        return cars[i] if i < len(cars) else None
+
+    def nearest(self, direction: str, floor: int):
+        below = self.nearest_at_or_below(direction, floor)
+        above = self.nearest_at_or_above(direction, floor)
+        if below is None or (above is not None and above[0] - floor < floor - below[0]):
+            return above
+        return below
+
+    def _remove(self, car_number: int, direction: str, floor: int):
+        cars = self.cars[direction]
+        del cars[bisect_left(cars, (floor, car_number))]
+
+
+class Bank:
+    def __init__(self, num_cars: int, clock=None, seed=None, config=None, log=None, policy=None):
+        if num_cars < 1:
+            raise ValueError(f"A bank needs at least 1 car, got {num_cars}")
+
+        self.clock = clock if clock else SimClock()
+        self.config = config if config else CONFIG()
+        # Every car reports to the same event log, each event carries its car number
+        self.log = log if log else EventLog()
+        # A policies.Policy decides which car gets each call and how the cars work through them (None for nearest car)
+        self.policy = policy
+        self.calls_per_car = bool(policy and policy.assigns_by_destination)
+        # One table of outside call buttons, shared by every car (unless each car keeps its own, see calls_per_car)
+        self.floors_waiting = {i : None for i in range(self.config.min_floor, self.config.max_floor + 1)}
+        self.up_calls = FloorSet(self.config.min_floor, self.config.max_floor)
+        self.down_calls = FloorSet(self.config.min_floor, self.config.max_floor)
+        self.index = CarIndex()
+        # Reversing costs roughly a trip to the end of the building and back
+        self.reverse_penalty = self.config.max_floor - self.config.min_floor
+
+        # Cars take turns drawing from one generator, so the whole bank is reproducible from one seed
+        self.generator = PassengerGenerator(seed)
+
+        self.cars = []
+        for car_number in range(num_cars):
+            car = Elevator(self.clock, interactive=False, config=self.config, log=self.log, policy=policy)
+            car.car_number = car_number
+            car.generator = self.generator
+            if not self.calls_per_car:
+                car.floors_waiting = self.floors_waiting
+                car.up_calls = self.up_calls
+                car.down_calls = self.down_calls
+            car.bank = self
+            car.idle = True
+            self.cars.append(car)
+            self.car_moved(car)
+
+    @property
+    def more_calls_coming(self) -> bool:
+        return any(car.more_calls_coming for car in self.cars)
+
+    @more_calls_coming.setter
+    def more_calls_coming(self, value: bool):
+        for car in self.cars:
+            car.more_calls_coming = value
+
+    @property
+    def metrics(self):
+        # metrics.attach gives every car the same Metrics
+        return self.cars[0].metrics
+
+    #### Public Functions ####
+    def move_elevator(self):
+        """Description: Same as Elevator.move_elevator, but runs every car in the bank on the shared clock"""
+        self.start()
+        self.clock.run()
+
+    def start(self):
+        for car in self.cars:
+            car.start()
+
+    def register_call(self, floor: int, direction: str, destination=None, waiting_passengers=None):
+        # Checked before a car is picked, a bad call mustn't leave a car marked busy in the index
+        if not self.config.min_floor <= floor <= self.config.max_floor:
+            raise ValueError(f"Call floor must be between {self.config.min_floor} - {self.config.max_floor}, got {floor}")
+        if destination is not None and not self.config.min_floor <= destination <= self.config.max_floor:
+            raise ValueError(f"Call destination must be between {self.config.min_floor} - {self.config.max_floor}, got {destination}")
+        direction = direction.upper()
+        if direction not in ("UP", "DOWN"):
+            raise ValueError(f"Call direction must be 'UP' or 'DOWN', got {direction!r}")
+        if floor == self.config.min_floor:
+            direction = "UP"
+        elif floor == self.config.max_floor:
+            direction = "DOWN"
+
+        if self.calls_per_car:
+            self._register_with_own_car(floor, direction, destination, waiting_passengers)
+            return
+
+        # Ignore duplicate floor + direction requests, a car is already on the way. The callers just join the queue
+        # (still counted as a call, the same as a single elevator counts them)
+        call = self.floors_waiting.get(floor)
+        if call and ((direction == "UP" and call.up) or (direction == "DOWN" and call.down)):
+            if waiting_passengers:
+                call.waiting_passengers.extend(waiting_passengers)
+            if destination is not None and destination != floor:
+                call.waiting_passengers.add(PASSENGER(*self.generator.passengers(1)[0], destination, self.clock.now))
+            if self.metrics:
+                self.metrics.call_registered(floor, direction)
+            return
+
+        self._hand_to(self.assign_car(floor, direction, destination), floor, direction, waiting_passengers, destination)
+
+    def press_button(self, floor: int, car: int = 0):
+        if not 0 <= car < len(self.cars):
+            raise ValueError(f"Car must be between 0 - {len(self.cars) - 1}, got {car}")
+        self.cars[car].press_button(floor)
+
+    def calls_finished(self):
+        for car in self.cars:
+            car.calls_finished()
+
+    def assign_car(self, floor: int, direction: str, destination=None) -> Elevator:
+        """Description: Pick the car for a new call, the bank's policy decides if it has one"""
+        if self.policy:
+            return self.policy.assign_car(self, floor, direction, destination)
+        return self.nearest_car(floor, direction)
+
+    def nearest_car(self, floor: int, direction: str) -> Elevator:
+        """Description: Pick the car that can get to a call on 'floor' going 'direction' the soonest (in floors travelled)"""
+        candidates = []
+
+        # Cars already heading towards the call in the same direction, they can pick it up on the way
+        if direction == "UP":
+            approaching = self.index.nearest_at_or_below("UP", floor)
+            passed = self.index.nearest_at_or_above("UP", floor)
+        else:
+            approaching = self.index.nearest_at_or_above("DOWN", floor)
+            passed = self.index.nearest_at_or_below("DOWN", floor)
+        if approaching:
+            candidates.append((abs(approaching[0] - floor), approaching[1]))
+
+        idle = self.index.nearest("IDLE", floor)
+        if idle:
+            candidates.append((abs(idle[0] - floor), idle[1]))
+
+        # Cars going the other way have to finish their sweep and turn around first
+        opposite = self.index.nearest("DOWN" if direction == "UP" else "UP", floor)
+        if opposite:
+            candidates.append((abs(opposite[0] - floor) + self.reverse_penalty, opposite[1]))
+
+        # Cars that already went past the call have to turn around twice
+        if passed:
+            candidates.append((abs(passed[0] - floor) + 2 * self.reverse_penalty, passed[1]))
+
+        if not candidates:
+            # Every car is full, the closest one gets it once people get off
+            full = self.index.nearest("FULL", floor)
+            candidates.append((abs(full[0] - floor), full[1]))
+
+        return self.cars[min(candidates)[1]]
+
+    def call_answered(self, floor: int, car: Elevator):
+        """Description: Called by whichever car answers a call, so no other car still thinks it has to go there.
+        When every car has its own calls, the others' calls on that floor are still waiting for them"""
+        if self.calls_per_car:
+            car.assigned_calls.discard(floor)
+            return
+        for other in self.cars:
+            other.assigned_calls.discard(floor)
+
+    def car_moved(self, car: Elevator):
+        """Description: Called by a car whenever it changes floors, goes idle or its load changes, to keep the index up to date"""
+        if car.idle:
+            direction = "IDLE"
+        elif not car.has_room():
+            direction = "FULL"
+        else:
+            direction = car.direction
+        self.index.update(car.car_number, direction, car.current_floor)
+
+    #### Private functions ####
+    def _hand_to(self, car: Elevator, floor: int, direction: str, waiting_passengers=None, destination=None):
+        if car.idle:
+            # Take the car out of the idle list right away so calls at the same moment spread across the bank
+            car.idle = False
+            self.car_moved(car)
+        car.register_call(floor, direction, waiting_passengers, destination)
+
+    def _register_with_own_car(self, floor: int, direction: str, destination=None, waiting_passengers=None):
+        # Every caller gets the car the policy picks for their destination, even when the button is already lit for
+        # another car. Riders calling again (left behind or put off for the weight limit) are assigned a group per destination
+        groups = {}
+        for rider in waiting_passengers if waiting_passengers else ():
+            groups.setdefault(rider.destination, []).append(rider)
+        for rider_destination, riders in groups.items():
+            self._hand_to(self.assign_car(floor, direction, rider_destination), floor, direction, riders)
+
+        if destination is not None and destination != floor:
+            self._hand_to(self.assign_car(floor, direction, destination), floor, direction, destination=destination)
+        elif not groups:
+            # Nobody said where they're going, the car comes and makes up who was waiting like the shared table does
+            self._hand_to(self.assign_car(floor, direction), floor, direction)
@@ -0,0 +1,263 @@
+# benchmark.py
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+from elevator import CONFIG, PASSENGER, Elevator
+from event_log import EventLog
+from passenger_store import PassengerStore
+from sim_clock import SimClock
+from sweep import random_calls
+from traces import run_trace
+
+# Benchmarks for the simulator, so we can tell if a change made it faster or slower.
+# Whole runs are measured in simulated events per second (and peak memory in a separate traced run) across
+# building sizes and call rates. The hot paths inside a run are timed on their own with timeit.
+# Every timing is the best of several rounds, and the small ones run as many calls per round as fit in 0.2s
+# (timeit.Timer.autorange). On shared hardware the whole machine speeds up and slows down by tens of percent from
+# one second to the next, so every round is bracketed by a fixed bit of reference work. Results also keep their time
+# relative to it, and that's what the regression check compares. Anything that still looks worse is run again before
+# it's reported, a real slowdown shows up every time and a bad second on the machine doesn't.
+#
+# python benchmark.py --save baseline.json                  record a baseline
+# python benchmark.py --check baseline.json --threshold 0.2 fail if anything got more than 20% worse
+
+BUILDING_SIZES = (10, 100, 1000, 5000)
+CALL_RATES = (2.0, 10.0) # hall calls per simulated minute
+PASSENGER_COUNTS = (10, 1000, 100000)
+SEED = 1234
+ROUNDS = 5 # Timing rounds per whole simulation run
+SHORT_ROUNDS = 15 # Timing rounds for the small benchmarks, each a quarter of what autorange picks
+REFERENCE_CALLS = 100 # Calls to _reference_work before and after each round
+CONFIRM_ATTEMPTS = 2 # Extra runs of a benchmark that looks like it regressed before it's reported
+
+
+def bench_simulation(max_floor: int, call_rate: float, calls: int, rounds: int = ROUNDS) -> dict:
+    """Description: Simulated events per second (best of 'rounds' whole runs) and peak memory for a headless run"""
+    config = CONFIG(max_floor=max_floor)
+
+    def run():
+        elevator = Elevator(SimClock(), interactive=False, seed=SEED, config=config, log=EventLog(echo=False))
+        run_trace(elevator, random_calls(config, SEED, calls, call_rate))
+        return elevator
+
+    # tracemalloc slows everything down, so memory gets its own run
+    tracemalloc.start()
+    elevator = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall_seconds, relative = _time_rounds(run, 1, rounds)
+    events = elevator.clock.events_run
+    name = f"simulation floors={max_floor} call_rate={call_rate:g}"
+    return {
+        f"{name} events_per_second": _result(events / wall_seconds, "events/s", True, events / relative),
+        f"{name} peak_memory": _result(peak / 1024, "KiB", False),
+    }
+
+
+def bench_hot_paths(max_floor: int) -> dict:
+    """Description: Time the per-stop work of an elevator in a building with 'max_floor' floors"""
+    elevator = Elevator(SimClock(), interactive=False, seed=SEED, config=CONFIG(max_floor=max_floor),
+                        log=EventLog(echo=False))
+    for floor in range(2, max_floor, 7):
+        elevator.register_call(floor, "UP" if floor % 2 else "DOWN")
+        elevator.press_button(floor + 1)
+    elevator.current_floor = max_floor // 2
+    elevator.request_dir = "UP"
+    destinations = elevator.generator.destinations(30, elevator.config.min_floor, max_floor)
+    for rider, destination in zip(elevator.generator.passengers(30), destinations):
+        elevator.passengers.append(PASSENGER(*rider, destination))
+
+    sweep = elevator.button_lights.beyond(elevator.current_floor, "UP")
+    sweep.update(elevator.up_calls)
+    new_stop = next(floor for floor in range(max_floor, 0, -1) if floor not in sweep)
+
+    def add_stop():
+        # Adding a floor that's already there doesn't change anything, so take it back out each time
+        sweep.add(new_stop)
+        sweep.discard(new_stop)
+
+    tests = {
+        "on_the_way_calls": lambda: elevator.up_calls.beyond(elevator.current_floor, "UP"),
+        "on_the_way_buttons": elevator._check_int_button_on_the_way_stops,
+        "next_stop": lambda: sweep.lowest(),
+        "add_remove_stop": add_stop,
+        "check_max_load": elevator._check_if_over_max_load,
+    }
+    results = {}
+    for test, function in tests.items():
+        seconds, relative = _best_seconds(function)
+        results[f"hot_path {test} floors={max_floor}"] = _result(seconds * 1e9, "ns/call", False, relative)
+    return results
+
+
+def bench_passengers(count: int) -> dict:
+    """Description: Board 'count' riders, then let every other one off, then evict the rest last-on first-off.
+    Then board them again and unload them a floor at a time, the way the elevator does at its stops"""
+    riders = [PASSENGER(30, 70, 150 + i % 100, i % 10 + 1) for i in range(count)]
+
+    def run():
+        store = PassengerStore(PASSENGER)
+        slots = [store.board(rider) for rider in riders]
+        for slot in slots[::2]:
+            store.alight(slot)
+        while store:
+            store.pop()
+
+    def unload():
+        store = PassengerStore(PASSENGER)
+        for rider in riders:
+            store.board(rider)
+        for floor in range(1, 11):
+            store.alight_floor(floor)
+
+    seconds, relative = _best_seconds(run)
+    unload_seconds, unload_relative = _best_seconds(unload)
+    return {
+        f"passengers board_alight count={count}": _result(count / seconds, "passengers/s", True, count / relative),
+        f"passengers board_unload_floors count={count}": _result(count / unload_seconds, "passengers/s", True, count / unload_relative),
+    }
+
+
+def benchmark_jobs(quick=False) -> list:
+    """Description: Every benchmark to run as (function, args) pairs, each returning a dict of named results"""
+    sizes = BUILDING_SIZES[:2] if quick else BUILDING_SIZES
+    calls = 200 if quick else 2000
+    jobs = []
+    for max_floor in sizes:
+        for call_rate in CALL_RATES:
+            jobs.append((bench_simulation, (max_floor, call_rate, calls)))
+        jobs.append((bench_hot_paths, (max_floor,)))
+    for count in (PASSENGER_COUNTS[:2] if quick else PASSENGER_COUNTS):
+        jobs.append((bench_passengers, (count,)))
+    return jobs
+
+
+def run_benchmarks(quick=False) -> dict:
+    results = {}
+    groups = [] # Names of the results each job produced, in benchmark_jobs order, so one job can be run again
+    for function, args in benchmark_jobs(quick):
+        job_results = function(*args)
+        results.update(job_results)
+        groups.append(list(job_results))
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": results,
+        "groups": groups,
+    }
+
+
+def check_regressions(baseline: dict, current: dict, threshold: float) -> list:
+    """Description: Names and details of every result more than 'threshold' (0.2 = 20%) worse than the baseline,
+    and of every baseline result this run didn't measure (i.e. a --quick run checked against a full baseline)"""
+    regressions = []
+    for name, old in baseline["results"].items():
+        new = current["results"].get(name)
+        if not new:
+            regressions.append(f"{name}: in the baseline but not measured this time")
+            continue
+        # Timings are compared relative to the reference work measured next to them, memory as it is
+        key = "relative" if old.get("relative") and new.get("relative") else "value"
+        if not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key]
+        worse = -change if old["higher_is_better"] else change
+        if worse > threshold:
+            regressions.append(f"{name}: {old['value']:.1f} -> {new['value']:.1f} {new['unit']} "
+                               f"({worse:.0%} worse{' next to the reference work' if key == 'relative' else ''})")
+    return regressions
+
+
+def confirm_regressions(baseline: dict, report: dict, threshold: float, attempts: int = CONFIRM_ATTEMPTS) -> list:
+    """Description: check_regressions, but every benchmark that looks worse is run again up to 'attempts' more times
+    keeping its best result, since a real slowdown shows up every time and a noisy round doesn't"""
+    regressions = check_regressions(baseline, report, threshold)
+    for _ in range(attempts):
+        if not regressions:
+            break
+        flagged = {regression.split(":")[0] for regression in regressions}
+        for (function, args), names in zip(benchmark_jobs(report["quick"]), report["groups"]):
+            if flagged.isdisjoint(names):
+                continue
+            for name, result in function(*args).items():
+                report["results"][name] = _better(report["results"][name], result)
+        regressions = check_regressions(baseline, report, threshold)
+    return regressions
+
+
+def _reference_work():
+    # Plain Python arithmetic that never changes, to see how fast the machine is running right now
+    total = 0
+    for i in range(1000):
+        total += i * i
+    return total
+
+
+def _time_rounds(function, number: int, rounds: int = ROUNDS) -> tuple:
+    # (seconds per call in the fastest round, median over the rounds of seconds per call / reference seconds per call)
+    timer = timeit.Timer(function)
+    reference = timeit.Timer(_reference_work)
+    fastest = float("inf")
+    relative = []
+    for _ in range(rounds):
+        before = reference.timeit(REFERENCE_CALLS)
+        seconds = timer.timeit(number) / number
+        after = reference.timeit(REFERENCE_CALLS)
+        fastest = min(fastest, seconds)
+        relative.append(seconds / ((before + after) / (2 * REFERENCE_CALLS)))
+    return fastest, statistics.median(relative)
+
+
+def _best_seconds(function, rounds: int = SHORT_ROUNDS) -> tuple:
+    # _time_rounds with a quarter of the calls autorange says fit in 0.2s per round, short rounds follow the machine's
+    # speed changes more closely
+    number, _ = timeit.Timer(function).autorange()
+    return _time_rounds(function, max(1, number // 4), rounds)
+
+
+def _better(old: dict, new: dict) -> dict:
+    # Whichever of two results of the same benchmark came out better, by relative time when there is one
+    key = "relative" if old.get("relative") and new.get("relative") else "value"
+    if old["higher_is_better"]:
+        return new if new[key] > old[key] else old
+    return new if new[key] < old[key] else old
+
+
+def _result(value: float, unit: str, higher_is_better: bool, relative=None) -> dict:
+    # 'relative' is the same measurement against the reference work (see _time_rounds), None for things that aren't timed
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better, "relative": relative}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Elevator simulator benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small buildings and short runs only")
+    parser.add_argument("--save", metavar="FILE", help="write results to a JSON baseline file")
+    parser.add_argument("--check", metavar="FILE", help="compare against a baseline and exit 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="how much worse counts as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.quick)
+    width = max(len(name) for name in report["results"])
+    for name, result in report["results"].items():
+        print(f"{name.ljust(width)}  {result['value']:>14.1f} {result['unit']}")
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+
+    if args.check:
+        with open(args.check) as baseline_file:
+            regressions = confirm_regressions(json.load(baseline_file), report, args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%}")
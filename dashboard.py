@@ -0,0 +1,191 @@
+# dashboard.py
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from metrics import attach as attach_metrics
+
+# Live terminal dashboard for a running Elevator or Bank.
+# The simulation never draws anything itself. Every time its clock moves forward the dashboard checks the wall
+# clock, and at most once a frame copies what it wants to show into a small immutable FRAME. A renderer thread
+# picks up the newest frame at a capped frame rate and draws it. If drawing falls behind, frames are dropped
+# instead of queued, and the simulation carries on either way - handing over a frame is one assignment.
+#
+# Without a dashboard the clock's watcher stays None, so nothing here runs at all.
+
+DEFAULT_FPS = 10
+
+# What one frame shows - everything copied out of the simulation, so the renderer never touches live state
+FRAME = namedtuple("Frame", "sim_time wall_time events cars calls metrics")
+CAR_VIEW = namedtuple("CarView", "number floor direction idle doors_open riders load buttons")
+# 'buttons' is a tuple of the floors lit on that car's panel
+CALL_VIEW = namedtuple("CallView", "floor up down waiting")
+# One per floor with a call, 'waiting' is how many riders are queued there (0 if the caller didn't say who's waiting)
+METRICS_VIEW = namedtuple("MetricsView", "calls delivered wait_mean ride_mean door_cycles floors_travelled")
+
+CLEAR_LINE = "\x1b[K"
+HOME = "\x1b[H"
+CLEAR_BELOW = "\x1b[J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+
+class Dashboard:
+    def __init__(self, elevator, fps: float = DEFAULT_FPS, stream=None):
+        """Description: elevator is an Elevator or a Bank. Wait and ride times come from its metrics.Metrics,
+        one gets attached if it doesn't have one yet. Call start() to put it on screen and close() when the run is done"""
+        if fps <= 0:
+            raise ValueError(f"Dashboard fps must be more than 0, got {fps}")
+        self.elevator = elevator
+        self.clock = elevator.clock
+        self.config = elevator.config
+        self.cars = getattr(elevator, "cars", [elevator])
+        self.metrics = self.cars[0].metrics if self.cars[0].metrics else attach_metrics(elevator)
+        self.frame_interval = 1.0 / fps
+        self.stream = stream # None means whatever sys.stdout is at the time
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+
+        self._latest = None # Newest FRAME, replaced whole by the simulation and only ever read by the renderer
+        self._next_sample = 0.0
+        self._wait_total = 0.0
+        self._waits_seen = 0
+        self._ride_total = 0.0
+        self._rides_seen = 0
+        self._start_wall = 0.0
+        self._start_sim = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    #### Public Functions ####
+    def start(self):
+        """Description: Start watching the clock and drawing frames on a background thread"""
+        self._start_wall = time.perf_counter()
+        self._start_sim = self.clock.now
+        self._latest = self._frame()
+        self.clock.watcher = self._sample
+        self._write(HIDE_CURSOR)
+        self._thread = threading.Thread(target=self._render_loop, name="elevator-dashboard", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Description: Stop drawing, then draw the final state once more so it stays on screen"""
+        if self._thread is None:
+            return
+        if self.clock.watcher == self._sample:
+            self.clock.watcher = None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._draw(self._frame())
+        self._write(SHOW_CURSOR)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    #### Private functions ####
+    def _sample(self):
+        # Runs on the simulation's thread every time the clock moves, so it has to be cheap unless a frame is due
+        now = time.perf_counter()
+        if now >= self._next_sample:
+            self._next_sample = now + self.frame_interval
+            self._latest = self._frame(now)
+
+    def _frame(self, wall_time=None) -> FRAME:
+        cars = tuple(CAR_VIEW(car.car_number, car.current_floor, car.direction, car.idle, car.doors_open,
+                              len(car.passengers), car.passengers.total_weight, tuple(car.button_lights))
+                     for car in self.cars)
+        # Cars in a bank share one table of calls, unless each keeps its own (bank.Bank.calls_per_car)
+        waiting = {}
+        for table in {id(car.floors_waiting): car.floors_waiting for car in self.cars}.values():
+            for floor, call in table.items():
+                if call:
+                    up, down, count = waiting.get(floor, (False, False, 0))
+                    waiting[floor] = (up or call.up, down or call.down, count + len(call.waiting_passengers))
+        calls = tuple(CALL_VIEW(floor, *waiting[floor]) for floor in sorted(waiting))
+
+        # Only the samples added since the last frame get summed, so a long run doesn't make frames slower
+        metrics = self.metrics
+        self._wait_total += sum(metrics.wait_times[self._waits_seen:])
+        self._waits_seen = len(metrics.wait_times)
+        self._ride_total += sum(metrics.ride_times[self._rides_seen:])
+        self._rides_seen = len(metrics.ride_times)
+        metrics_view = METRICS_VIEW(metrics.calls, self._rides_seen,
+                                    self._wait_total / self._waits_seen if self._waits_seen else 0.0,
+                                    self._ride_total / self._rides_seen if self._rides_seen else 0.0,
+                                    metrics.door_cycles, metrics.floors_travelled)
+        return FRAME(self.clock.now, wall_time if wall_time else time.perf_counter(), self.clock.events_run, cars, calls, metrics_view)
+
+    def _render_loop(self):
+        next_frame = time.perf_counter()
+        drawn = None
+        while not self._stop.wait(max(0.0, next_frame - time.perf_counter())):
+            frame = self._latest
+            if frame is not drawn:
+                self._draw(frame)
+                drawn = frame
+
+            next_frame += self.frame_interval
+            behind = time.perf_counter() - next_frame
+            if behind > 0:
+                # Drawing took longer than a frame. Drop the frames that are already late instead of rushing to catch up
+                missed = int(behind // self.frame_interval) + 1
+                self.frames_skipped += missed
+                next_frame += missed * self.frame_interval
+
+    def _draw(self, frame: FRAME):
+        self.frames_drawn += 1
+        self._write(HOME + render(frame, self.config, self._speed(frame), self.frames_skipped).replace("\n", CLEAR_LINE + "\n")
+                    + CLEAR_LINE + "\n" + CLEAR_BELOW)
+
+    def _speed(self, frame: FRAME) -> float:
+        wall_seconds = frame.wall_time - self._start_wall
+        return (frame.sim_time - self._start_sim) / wall_seconds if wall_seconds > 0 else 0.0
+
+    def _write(self, text: str):
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+def render(frame: FRAME, config, speed: float = 0.0, frames_skipped: int = 0) -> str:
+    """Description: A frame as text - one row per floor, top floor first, with the calls waiting there and a column per car.
+    A car shows as [^ 4] on its floor (heading up with 4 riders, '-' when idle, '|' with the doors open), a lit panel button as *"""
+    hours, seconds = divmod(frame.sim_time, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    lines = [f"Elevator dashboard - {int(hours):02d}:{int(minutes):02d}:{seconds:04.1f} simulated"
+             f"   {speed:,.0f}x real time   {frame.events:,} events   {frames_skipped} frames skipped", ""]
+
+    calls = {call.floor: call for call in frame.calls}
+    car_header = "".join(f"  Car {car.number:<2}" for car in frame.cars)
+    lines.append(f" Floor  Calls  Waiting{car_header}")
+    for floor in range(config.max_floor, config.min_floor - 1, -1):
+        call = calls.get(floor)
+        buttons = f"{'^' if call and call.up else ' '} {'v' if call and call.down else ' '}"
+        waiting = str(call.waiting) if call and call.waiting else ""
+        cells = "".join(f"  {_car_cell(car, floor):^6}" for car in frame.cars)
+        lines.append(f" {floor:>5}   {buttons}  {waiting:>7}{cells}")
+
+    lines.append("")
+    for car in frame.cars:
+        state = "idle" if car.idle else f"going {car.direction}"
+        doors = "open" if car.doors_open else "closed"
+        lines.append(f" Car {car.number}: floor {car.floor}, {state}, doors {doors}, {car.riders} riders, "
+                     f"{car.load}/{config.max_weight} lbs")
+
+    metrics = frame.metrics
+    lines.append(f" Calls {metrics.calls:,}   delivered {metrics.delivered:,}   wait {metrics.wait_mean:.1f}s   "
+                 f"ride {metrics.ride_mean:.1f}s   door cycles {metrics.door_cycles:,}   floors {metrics.floors_travelled:,}")
+    return "\n".join(lines)
+
+
+def _car_cell(car: CAR_VIEW, floor: int) -> str:
+    if car.floor == floor:
+        arrow = "-" if car.idle else ("^" if car.direction == "UP" else "v")
+        return f"[{'|' if car.doors_open else arrow}{car.riders:>2}]"
+    return "*" if floor in car.buttons else "."
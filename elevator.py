@@ -1,12 +1,18 @@
 # elevator.py
-import time
-import sys
-from collections import namedtuple, deque
-# deque is very similar to Java Double-Ended Queue from what I understand
+import argparse
+import math
+from collections import namedtuple
 from pprint import pprint as pp
 # I use pprint mostly for troubleshooting and development
 from threading import Timer
-from random import randint
+from dashboard import DEFAULT_FPS, Dashboard
+from event_log import DEBUG, EVENT, INFO, WARNING, EventLog, open_sink
+from floor_index import CallQueue, FloorSet
+from metrics import attach as attach_metrics
+from passenger_generator import HEAVIEST_PASSENGER, PassengerGenerator
+from passenger_store import PassengerStore, WaitingRiders
+from sim_clock import SimClock
+from traces import read_trace, run_trace
 
 # GLOBALS - using globals for quick editing and to avoid 'magic numbers'
 MAX_FLOOR = 10
@@ -14,16 +20,23 @@ MIN_FLOOR = 1
 MAX_WEIGHT = 2000 # 2,000 pounds seems pretty typical
 ELEVATOR_FPS = 2 # Floors per second (Google says 1-3 is the average for shorter building...)
 DOOR_SPEED = 4 # Seconds (best guess based on personal experience)
+LOAD_BYPASS = 0.8 # Share of MAX_WEIGHT where a car stops picking people up and only lets them off. 80% seems to be the usual setting
 HEADER_DASHES = 72
 
 # NAMED TUPLE GLOBALS
 # I like using named tuples as immutable mini 'classes'
 
 CALL = namedtuple("Call", "down up waiting_passengers") # Would likely make a JAVA class for elevator calls
-# 'down' and 'up' variables are boolean and 'waiting_passengers' is a list of passenger named tuples 
+# 'down' and 'up' variables are boolean and 'waiting_passengers' is a passenger_store.WaitingRiders, passengers queued by where they're going
 
-PASSENGER = namedtuple("Passenger", "age height weight")# Would likely make a JAVA class for passengers
-# age, height, weight are all integers
+CONFIG = namedtuple("Config", "min_floor max_floor max_weight elevator_fps door_speed",
+                    defaults=(MIN_FLOOR, MAX_FLOOR, MAX_WEIGHT, ELEVATOR_FPS, DOOR_SPEED))
+# Per elevator building settings, the globals above are the defaults. Elevator(config=CONFIG(max_floor=50)) for a taller building
+
+PASSENGER = namedtuple("Passenger", "age height weight destination called_at", defaults=(None,))# Would likely make a JAVA class for passengers
+# age, height, weight are all integers, destination is the floor they're going to
+# called_at is the simulated time they pressed the call button, None for riders made up when the doors open (their wait
+# counts from the first press of the button). Only waiting riders have it, the PassengerStore keeps the first four
 # Could add other PPI like 'name' or 'gender' but don't think that's in scope for an elevator
 
 # This object was mostly for fun, but could use it as a map for labeling floors, or some other sort of lookup
@@ -34,20 +47,87 @@ FLOOR_STRINGS = {
     4 : "th Floor: Mens Wear" # old joke I don't remember the origin of - I think it might have been 1st floor
     } 
 
+def _dots(seconds: float, interval=0.25) -> str:
+    # Time passes on the simulation clock now, so the dots are only there to keep the old 'loading' look
+    return "." * math.ceil(seconds / interval)
+
+def _ding(event) -> str:
+    floor_string = FLOOR_STRINGS[event.floor] if event.floor in FLOOR_STRINGS.keys() else "th Floor"
+    return f"{'-'*HEADER_DASHES}\n|{'*'*5} DING! {event.floor}{floor_string} {'*'*5}\n{'-'*HEADER_DASHES}"
+
+# How each event_log.EVENT kind reads on the terminal. Only called when the log is echoing, so quiet runs never build any of these strings
+EVENT_TEXT = {
+    "at_floor": lambda e: f"Elevator at Floor {e.floor}\n",
+    "called": lambda e: f"\nCalled to floor {e.floor}",
+    "load": lambda e: f"\t - Elevator Load = {e.value} pounds",
+    "overweight": lambda e: "Elevator about weight limit. passengers must exit",
+    "stranded": lambda e: f"{e.value} exited elevator on {e.floor} and will be added back to the que",
+    "next_floor": lambda e: f"\n{'-'*HEADER_DASHES}\n| Next Floor: {e.floor}\n{'-'*HEADER_DASHES}",
+    "going_up": lambda e: "\t- Elevator going Up" + _dots(e.value),
+    "going_down": lambda e: "\t- Elevator going Down" + _dots(e.value),
+    "ding": _ding,
+    "doors_opening": lambda e: "\t- Doors opening" + _dots(e.value),
+    "doors_closing": lambda e: "\t - Closing Doors" + _dots(e.value),
+    "boarded": lambda e: f"\t - {e.value} Passengers boarded the elevator",
+    "exited": lambda e: f"\t - {e.value} Passengers exited on floor",
+    "checking_up": lambda e: "\t - Checking for active panel buttons for floors on the way UP",
+    "checking_down": lambda e: "\t - Checking for active panel buttons for floors on the way DOWN",
+}
+# 'sweep' and 'panel' print elevator state that isn't in the event, so they pass their own render function
+
+def check_config(config):
+    """Description: Raise a ValueError for building settings the simulation can't finish with"""
+    # A rider who can't fit in an empty car calls again forever and the run never ends
+    if config.max_weight <= HEAVIEST_PASSENGER:
+        raise ValueError(f"max_weight must be over {HEAVIEST_PASSENGER} lbs so the heaviest passenger fits, got {config.max_weight}")
+
+
 class Elevator:
-    def __init__(self):
-        self.current_floor = MIN_FLOOR # Assume elevator is parked on it's lowest floor (may not apply to buildings with basement levels)
-        self.direction = 'UP' if self.current_floor <= MAX_FLOOR/2 - 1 else "DOWN" # using roughly the middle floor to determine default directions
+    def __init__(self, clock=None, interactive=True, seed=None, config=None, log=None, policy=None):
+        self.config = config if config else CONFIG()
+        check_config(self.config)
+        # Everything the elevator reports goes through an event_log.EventLog. The default echoes it all like the old prints did
+        self.log = log if log else EventLog()
+        # Travel and door times are simulated on the clock rather than slept through
+        self.clock = clock if clock else SimClock()
+        # interactive=False is headless mode. Calls and panel buttons come from register_call() and press_button()
+        # (i.e. a trace file) instead of input() prompts
+        self.interactive = interactive
+        # Fired whenever a new call or panel button comes in, so an idle headless elevator can wake back up
+        self.call_signal = self.clock.signal()
+        # Set by whatever is feeding calls in headless mode. An idle elevator only waits for calls while this is True
+        self.more_calls_coming = False
+        # Set when the elevator is one car in a Bank. The bank keeps an index of where every car is
+        self.bank = None
+        self.car_number = 0
+        self.idle = False
+        self.started = False # Whether start() or resume() has put the elevator on its clock yet
+        # A policies.Policy picks the next stop. None keeps the original first come first served sweep
+        self.policy = policy
+        # Set to a metrics.Metrics to record passenger wait and ride times (see metrics.attach)
+        self.metrics = None
+        self.current_floor = self.config.min_floor # Assume elevator is parked on it's lowest floor (may not apply to buildings with basement levels)
+        self.direction = 'UP' if self.current_floor <= self.config.max_floor/2 - 1 else "DOWN" # using roughly the middle floor to determine default directions
         self.request_dir = ""
         self.doors_open = False
-        self.passengers = deque()
+        # Riders that didn't fit at the last stop, they call again once the car moves on (see _add_passengers)
+        self._left_behind = None
+        # Every random passenger and decision comes from here, so the same seed gives the same run
+        self.generator = PassengerGenerator(seed)
+        # Riders are kept in parallel arrays with a running total of their weight, see passenger_store.py
+        self.passengers = PassengerStore(PASSENGER)
 
-        # button_lights keeps track of the buttons inside the elevator
-        self.button_lights = {i : 'off' for i in range(MIN_FLOOR, MAX_FLOOR + 1)}
+        # button_lights keeps track of the buttons inside the elevator. A floor in the set means its button is lit
+        self.button_lights = FloorSet(self.config.min_floor, self.config.max_floor)
 
         # floors_waiting and waiting_que keep track of outside elevator up and down call buttons
-        self.floors_waiting = {i : None for i in range(MIN_FLOOR, MAX_FLOOR + 1)}
-        self.waiting_que = deque()
+        self.floors_waiting = {i : None for i in range(self.config.min_floor, self.config.max_floor + 1)}
+        self.waiting_que = CallQueue()
+        # up_calls and down_calls index floors_waiting by direction, so finding calls on the way doesn't walk every floor
+        self.up_calls = FloorSet(self.config.min_floor, self.config.max_floor)
+        self.down_calls = FloorSet(self.config.min_floor, self.config.max_floor)
+        # Hall calls given to this car. The same as up_calls + down_calls for a single elevator, a Bank shares those between cars
+        self.assigned_calls = FloorSet(self.config.min_floor, self.config.max_floor)
 
     #### Public Functions ####
     def move_elevator(self):
@@ -55,153 +135,162 @@ class Elevator:
         Description: Main class of script. Will run if there are already values in self.waiting_que. 
         If waiting_que is empty it will launch the terminal interface that simulates people pressing the external call buttons
         """
-
-        print(f"Elevator at Floor {self.current_floor}\n")
-        while len(self.waiting_que) > 0:
-            called_floors = set() # Keep track of floors that were selected by either call button, or internal panel
-
-            dest_floor = self.waiting_que.popleft()
-            print(f"\nCalled to floor {dest_floor}")
-            self._print_panel_lights()
-
-            if self.current_floor != dest_floor:
-                called_floors.add(dest_floor)
-            
-            # Set elevators requested direction
-            if self.floors_waiting[dest_floor].up:
-                self.request_dir = "UP"
-            elif self.floors_waiting[dest_floor].down:
-                self.request_dir = "DOWN"
-
-            # Check for requests that are on the way, and are going the same direction
-            if self.request_dir == "DOWN":
-                for i in range(self.current_floor, MIN_FLOOR -1, -1):
-                    # print(i)
-                    if self.floors_waiting.get(i) and self.floors_waiting[i].down:
-                        called_floors.add(i)
-                        if i in self.waiting_que:
-                            self.waiting_que.remove(i)
-
-            elif self.request_dir == "UP":
-                for i in range(self.current_floor, MAX_FLOOR + 1):
-                    if self.floors_waiting.get(i) and self.floors_waiting[i].up:
-                        called_floors.add(i)
-                        if i in self.waiting_que:
-                            self.waiting_que.remove(i)
-
-            # Iterate through all floors towards the destination floor, stopping on floors on the way
-            called_floor_que = self._sort_queue(called_floors)
-
-            while len(called_floor_que) > 0:
-                print(called_floor_que)
-                next_floor = called_floor_que.popleft()
-                self.goto_floor(next_floor)
-
-                # Check if any internal elevator buttons have been pushed
-                # And add floors to queue if they're on the way.
-                additional_stops = self._check_int_button_on_the_way_stops()
-
-                if additional_stops:
-                    for stop in additional_stops:
-                        if stop not in called_floor_que:
-                            called_floor_que.append(stop)
-                    # re-sort the queue if new stops were added.
-                    called_floor_que = self._sort_queue(called_floor_que)
-
-                # IF no more stops in current direction, change direction and check again
-                if len(called_floor_que) == 0:
-                    if self.request_dir == "UP":
-                        self.request_dir = "DOWN"
-                    else:
-                        self.request_dir = "UP"
-                    additional_stops = self._check_int_button_on_the_way_stops()
-                    
-                    if additional_stops:
-                        for stop in additional_stops:
-                            if stop not in called_floor_que:
-                                called_floor_que.append(stop)
-                        
-                        # re-sort if floors were added
-                        called_floor_que = self._sort_queue(called_floor_que)
-        
-        if len(self.waiting_que) == 0:
-            self._update_floor_waiting_queue()
-            if len(self.waiting_que) > 0:
-                self.move_elevator()
-            else:
-                # If there are no more stops left go back to ground, and have all passengers exit
-                self.goto_floor(1)
-                self._offload_passengers()
+        self.start()
+        self.clock.run()
+
+    def start(self):
+        """Description: Add the elevator to its clock without running the clock (i.e. several cars sharing one clock)"""
+        self.started = True
+        self.clock.process(self._run())
+
+    def resume(self):
+        """Description: start() for an elevator restored from a snapshot (see snapshot.py).
+        A car that was idle goes straight back to waiting for calls, just like the one the snapshot was taken from"""
+        if self.idle:
+            self.started = True
+            self.call_signal.wait(self._run_after_idle())
+        else:
+            self.start()
 
     def goto_floor(self, dest_floor: int):
+        """Description: Simulation process that moves the elevator to dest_floor and cycles the doors.
+        Use 'yield from elevator.goto_floor(floor)' from inside another process"""
         above_weight_limit = self._check_if_over_max_load()
         
         if above_weight_limit:
-            print(f"Elevator about weight limit. passengers must exit")
+            self._log(WARNING, "overweight", self.current_floor, self.passengers.total_weight)
             stranded_passengers = self._last_passengers_on_get_off(above_weight_limit)
-            print(f"{len(stranded_passengers)} exited elevator on {self.current_floor} and will be added back to the que")
-            direction = self.request_dir if self.request_dir else self.direction
+            self._log(WARNING, "stranded", self.current_floor, len(stranded_passengers))
 
-            self._que_up_stranded_passengers(stranded_passengers, self.current_floor, direction)
+            self._que_up_stranded_passengers(stranded_passengers, self.current_floor)
         
-        if dest_floor and dest_floor != self.current_floor:
-            # Calculate the difference between floors needed to travel to destination floor
-            high_floor = max(self.current_floor, dest_floor)
-            low_floor = min(self.current_floor, dest_floor)
-            diff = high_floor - low_floor
-
-            # Set the elevators direction towards target floor
-            if high_floor == self.current_floor or self.current_floor == MAX_FLOOR:
-                self.direction = "DOWN"
-            elif low_floor == self.current_floor or self.current_floor== MIN_FLOOR:
-                self.direction = "UP"
-
-            # Update Elevator Stats
-            self.current_floor = dest_floor
-
-            # Sleep to simulate moving to floor
-            travel_time = float(diff/ELEVATOR_FPS)
-            print(f"\n{'-'*HEADER_DASHES}\n| Next Floor: {dest_floor}\n{'-'*HEADER_DASHES}")
-            # Moving an elevator can take a lot of time. No wonder video game developers us them a loading mechanisms
-            self._print_loading_dots(travel_time, f"\t- Elevator going {self.direction.title()}")
-            floor_string = FLOOR_STRINGS[dest_floor] if dest_floor in FLOOR_STRINGS.keys() else "th Floor"
-            print(f"{'-'*HEADER_DASHES}\n|{'*'*5} DING! {dest_floor}{floor_string} {'*'*5}\n{'-'*HEADER_DASHES}")
-
-            self._open_doors()
-            self._print_panel_lights()
-            self._close_doors()
-            # Turn of panel light when on that floor
-            self.button_lights[dest_floor] = "off"
+        if dest_floor is None:
+            return
+
+        if dest_floor != self.current_floor:
+            yield from self.travel_to(dest_floor)
+        elif not self.floors_waiting.get(dest_floor) and dest_floor not in self.button_lights:
+            # Already on this floor and nobody is waiting for the elevator or getting off here
+            return
+
+        if self.metrics:
+            self.metrics.stopped(self.car_number, dest_floor)
+        yield from self._open_doors()
+        self._print_panel_lights()
+        yield from self._close_doors()
+        # Turn of panel light when on that floor
+        self.button_lights.discard(dest_floor)
+
+    def travel_to(self, dest_floor: int):
+        """Description: Simulation process that moves the elevator to dest_floor without opening the doors (i.e. passing through)"""
+        # Calculate the difference between floors needed to travel to destination floor
+        high_floor = max(self.current_floor, dest_floor)
+        low_floor = min(self.current_floor, dest_floor)
+        diff = high_floor - low_floor
+        departed_floor = self.current_floor
+
+        # Set the elevators direction towards target floor
+        if high_floor == self.current_floor or self.current_floor == self.config.max_floor:
+            self.direction = "DOWN"
+        elif low_floor == self.current_floor or self.current_floor== self.config.min_floor:
+            self.direction = "UP"
+
+        # Update Elevator Stats
+        self.current_floor = dest_floor
+        if self.metrics:
+            self.metrics.travelled(diff)
+        if self.bank:
+            self.bank.car_moved(self)
+        # Anyone who didn't fit at the last stop presses the call button again as the car leaves. The car has already
+        # moved on in the bank's index, so their call doesn't get handed straight back to it
+        self._recall_left_behind(departed_floor)
+
+        # Wait on the simulation clock to simulate moving to floor
+        travel_time = float(diff/self.config.elevator_fps)
+        self._log(INFO, "next_floor", dest_floor, diff)
+        # Moving an elevator can take a lot of time. No wonder video game developers us them a loading mechanisms
+        yield from self._wait(travel_time, "going_up" if self.direction == "UP" else "going_down")
+        self._log(INFO, "ding", dest_floor)
+
+    def register_call(self, floor: int, direction: str, waiting_passengers=None, destination=None):
+        """Description: Press the outside call button on 'floor'. direction is 'UP' or 'DOWN'.
+        Duplicate floor + direction requests are ignored. destination is where the caller is going, if it's known.
+        waiting_passengers are riders (PASSENGERs with a destination) already waiting there, i.e. stranded by an overweight car"""
+        if not self.config.min_floor <= floor <= self.config.max_floor:
+            raise ValueError(f"Call floor must be between {self.config.min_floor} - {self.config.max_floor}, got {floor}")
+        if destination is not None and not self.config.min_floor <= destination <= self.config.max_floor:
+            raise ValueError(f"Call destination must be between {self.config.min_floor} - {self.config.max_floor}, got {destination}")
+        direction = direction.upper()
+        if direction not in ("UP", "DOWN"):
+            raise ValueError(f"Call direction must be 'UP' or 'DOWN', got {direction!r}")
+
+        # The bottom floor only has an up button and the top floor only has a down button
+        if floor == self.config.min_floor:
+            direction = "UP"
+        elif floor == self.config.max_floor:
+            direction = "DOWN"
+
+        call = self.floors_waiting.get(floor)
+        if call:
+            if (direction == "UP" and not call.up) or (direction == "DOWN" and not call.down):
+                self.floors_waiting[floor] = call._replace(up = call.up or direction == "UP", down = call.down or direction == "DOWN")
+        else:
+            call = self.floors_waiting[floor] = CALL(down = direction == "DOWN", up = direction == "UP", waiting_passengers = WaitingRiders())
+        if waiting_passengers:
+            call.waiting_passengers.extend(waiting_passengers)
+        if destination is not None and destination != floor:
+            # The trace knows where this caller is going, so they wait in that floor's queue
+            call.waiting_passengers.add(self._create_passenger(destination, self.clock.now))
+
+        if direction == "UP":
+            self.up_calls.add(floor)
+        else:
+            self.down_calls.add(floor)
+        self.waiting_que.append(floor) # Floors already in the queue keep their place
+        self.assigned_calls.add(floor)
+        if self.metrics:
+            self.metrics.call_registered(floor, direction)
+        self.call_signal.fire()
+
+    def calls_finished(self):
+        """Description: Headless mode - nothing else is going to call the elevator, so it can wrap up once it's out of calls"""
+        self.more_calls_coming = False
+        self.call_signal.fire()
+
+    def press_button(self, floor: int, car: int = 0):
+        """Description: Press a floor button on the internal panel. Floors outside the building are ignored.
+        'car' is there so a single elevator takes the same presses as a Bank, it only has car 0"""
+        if car:
+            raise ValueError(f"A single elevator only has car 0, got a press in car {car}")
+        if self.config.min_floor <= floor <= self.config.max_floor:
+            self.button_lights.add(floor)
+            self.call_signal.fire()
+
+    def has_room(self) -> bool:
+        """Description: Whether the elevator still stops for outside calls. Past LOAD_BYPASS it passes them by until people get off"""
+        return self.passengers.total_weight < self.config.max_weight * LOAD_BYPASS
+
+    def has_stop(self, floor: int) -> bool:
+        """Description: Whether somebody is waiting on 'floor' or wants to get off there"""
+        return bool(self.floors_waiting.get(floor)) or floor in self.button_lights
 
     def call_elevator_interface(self):
-        start_floor = MIN_FLOOR - 1 # Setting dynamically assuming a building could have basement floors represented by negative numbers
+        start_floor = self.config.min_floor - 1 # Setting dynamically assuming a building could have basement floors represented by negative numbers
         up_or_down = ''
 
-        while start_floor < MIN_FLOOR or up_or_down == "":
+        while start_floor < self.config.min_floor or up_or_down == "":
             print("Please enter the floor you're on, and the direction you want to go (up or down) separated by a space")
             args = input("$: ").split(" ")
             if args[0].isdigit() and args[1].lower() == 'down' or args[1].lower() == 'up':
                 # try:
                 start_floor = int(args[0])
-                if MIN_FLOOR <= start_floor <= MAX_FLOOR:
+                if self.config.min_floor <= start_floor <= self.config.max_floor:
                     up_or_down = args[1].upper()
-                    
-                    down_bool = True if up_or_down =="DOWN" else False
-                    up_bool = True if up_or_down == "UP" else False
-
-                    if start_floor == MIN_FLOOR:
-                        self.floors_waiting[start_floor] = CALL(down = False, up = True, waiting_passengers = [])
-                        self.waiting_que.append(start_floor)
-                    elif start_floor == MAX_FLOOR:
-                        self.floors_waiting[start_floor] = CALL(down = True, up = False, waiting_passengers = [])
-                        self.waiting_que.append(start_floor)
-                    else:
-                        self.floors_waiting[start_floor] = CALL(down_bool, up_bool, [])
-                        self.waiting_que.append(start_floor)
+                    self.register_call(start_floor, up_or_down)
 
                 else:
-                    print(f"Start Floor must be between {MIN_FLOOR} - {MAX_FLOOR}")
-                    start_floor = MIN_FLOOR - 1
+                    print(f"Start Floor must be between {self.config.min_floor} - {self.config.max_floor}")
+                    start_floor = self.config.min_floor - 1
                     up_or_down = ""
                 # except:
                     print(f"Invalid Floor Number: Please enter a number between 1 - 10 for your current floor and 'up' or 'down' for your direction")
@@ -215,7 +304,10 @@ class Elevator:
 
         while above_weight:
             # Last passenger added gets off
-            removed_passenger = self.passengers.pop()
+            slot = self.passengers.last_slot()
+            removed_passenger = self.passengers.alight(slot)
+            if self.metrics:
+                self.metrics.evicted(self.car_number, slot)
             # Passengers will queue again on floor they had to exit on
             stranded_passengers.append(removed_passenger)
             above_weight = self._check_if_over_max_load()
@@ -224,132 +316,248 @@ class Elevator:
 
     def _check_if_over_max_load(self) -> bool:
         above_weight = False
-        total_weight = 0
-        if len(self.passengers) > 0:
-            total_weight = sum([p.weight for p in self.passengers])
-        print(f"\t - Elevator Load = {total_weight} pounds")
-        if total_weight >= MAX_WEIGHT:
+        total_weight = self.passengers.total_weight
+        self._log(DEBUG, "load", self.current_floor, total_weight)
+        if total_weight >= self.config.max_weight:
             above_weight = True
         return above_weight
 
-    def _check_int_button_on_the_way_stops(self) -> set:
-        print(f"\t - Checking for active panel buttons for floors on the way {self.request_dir}")
-
-        additional_destinations = set()
-        if  self.request_dir == "DOWN":
-            for i in range(self.current_floor, MIN_FLOOR -1, -1):
-                if self.button_lights.get(i) == 'on':
-                    additional_destinations.add(i)
-        if self.request_dir == "UP":
-            for i in range(self.current_floor, MAX_FLOOR + 1):
-                if self.button_lights.get(i) == 'on':
-                    additional_destinations.add(i)
-
-        return additional_destinations
-
-    def _sort_queue(self, que) -> deque:
-        if self.request_dir == 'DOWN':
-            que = sorted(que, reverse=True)
-        else:
-            que = sorted(que)
-
-        return deque(que)
+    def _check_calls_on_the_way_stops(self) -> FloorSet:
+        # Outside calls going the same way as the elevator. They come out of waiting_que since this sweep will answer them
+        if not self.has_room():
+            return FloorSet(self.config.min_floor, self.config.max_floor)
+        calls = self.up_calls if self.request_dir == "UP" else self.down_calls
+        on_the_way = calls.beyond(self.current_floor, self.request_dir)
+        for i in on_the_way:
+            self.waiting_que.discard(i)
+        return on_the_way
+
+    def _next_panel_stop(self) -> int:
+        # Closest lit panel button, carrying on the way the elevator was going if there's one that way
+        if self.current_floor in self.button_lights:
+            return self.current_floor
+        direction = self.request_dir if self.request_dir else self.direction
+        next_floor = self.button_lights.next_stop(self.current_floor, direction)
+        if next_floor is None:
+            direction = "DOWN" if direction == "UP" else "UP"
+            next_floor = self.button_lights.next_stop(self.current_floor, direction)
+        self.request_dir = direction
+        return next_floor
+
+    def _check_int_button_on_the_way_stops(self) -> FloorSet:
+        self._log(DEBUG, "checking_up" if self.request_dir == "UP" else "checking_down", self.current_floor)
+        return self.button_lights.beyond(self.current_floor, self.request_dir)
 
 
     #### Private void functions ####
 
-    def _que_up_stranded_passengers(self, stranded_passengers: list, floor: int, direction: str):
-        up_bool = False
-        down_bool = False
-
-        if direction == "UP":
-            up_bool = True
-        elif direction == "DOWN":
-            down_bool = True
-
-        self.floors_waiting[floor] = CALL(down_bool, up_bool, stranded_passengers)
-        self.waiting_que.append(floor)
+    def _run(self):
+        """Description: The elevator as a simulation process. Every 'yield' hands a wait (travel or door time) to the clock"""
+        while True:
+            self._log(INFO, "at_floor", self.current_floor)
+            if self.policy:
+                yield from self.policy.serve(self)
+            while len(self.waiting_que) > 0:
+                called_floors = FloorSet(self.config.min_floor, self.config.max_floor) # Keep track of floors that were selected by either call button, or internal panel
+
+                dest_floor = self.waiting_que.popleft()
+                if not self.floors_waiting[dest_floor]:
+                    # Another car in the bank already answered this call
+                    continue
+                self._log(INFO, "called", dest_floor)
+                self._print_panel_lights()
+
+                if self.current_floor == dest_floor:
+                    # Called to the floor it's already on, just open the doors
+                    yield from self.goto_floor(dest_floor)
+                    continue
+                called_floors.add(dest_floor)
+            
+                # Set elevators requested direction
+                if self.floors_waiting[dest_floor].up:
+                    self.request_dir = "UP"
+                elif self.floors_waiting[dest_floor].down:
+                    self.request_dir = "DOWN"
+
+                # Check for requests that are on the way, and are going the same direction
+                called_floors.update(self._check_calls_on_the_way_stops())
+
+                # Iterate through all floors towards the destination floor, stopping on floors on the way
+                # Going up the lowest floor is next, going down the highest floor is next
+                while called_floors:
+                    self._log(DEBUG, "sweep", self.current_floor, len(called_floors), lambda event: str(called_floors))
+                    next_floor = called_floors.lowest() if self.request_dir == "UP" else called_floors.highest()
+                    called_floors.discard(next_floor)
+                    yield from self.goto_floor(next_floor)
+
+                    # Check if any internal elevator buttons have been pushed, or new calls came in while moving
+                    # And add floors to queue if they're on the way.
+                    called_floors.update(self._check_int_button_on_the_way_stops())
+                    called_floors.update(self._check_calls_on_the_way_stops())
+
+                    # IF no more stops in current direction, change direction and check again
+                    if not called_floors:
+                        if self.request_dir == "UP":
+                            self.request_dir = "DOWN"
+                        else:
+                            self.request_dir = "UP"
+                        called_floors.update(self._check_int_button_on_the_way_stops())
+
+                if self.metrics:
+                    self.metrics.trip_finished(self.car_number)
+
+            if self.button_lights or self._left_behind:
+                # Take the riders still on board where they're going before looking for new calls,
+                # and whoever didn't fit last time calls again so the elevator comes back for them
+                # (as it leaves, see travel_to, or right away if there's nowhere to take anyone)
+                if self.button_lights:
+                    yield from self.goto_floor(self._next_panel_stop())
+                else:
+                    self._recall_left_behind()
+                continue
+
+            if self.interactive:
+                self._update_floor_waiting_queue()
+            elif self.more_calls_coming:
+                # Headless elevators sit idle until the next call or panel button comes in
+                self._set_idle(True)
+                yield self.call_signal
+                self._set_idle(False)
+                continue
+
+            if len(self.waiting_que) == 0:
+                # If there are no more stops left go back to ground, and have all passengers exit
+                yield from self.goto_floor(self.config.min_floor)
+                self._offload_passengers()
+                return
+
+    def _run_after_idle(self):
+        # Parked on call_signal by resume(), so the first step runs once a call wakes it up
+        self._set_idle(False)
+        yield from self._run()
+
+    def _que_up_stranded_passengers(self, stranded_passengers: list, floor: int):
+        # Riders know where they're going, so they press up or down depending on their destination
+        # In a bank the call goes back through the bank, another car might be a better fit for them now
+        caller = self.bank if self.bank else self
+        # Anyone put off for the weight limit starts waiting again now, anyone who never got on keeps their place in time
+        now = self.clock.now
+        stranded_passengers = [p if p.called_at is not None else p._replace(called_at=now) for p in stranded_passengers]
+        going_up = [p for p in stranded_passengers if p.destination > floor]
+        going_down = [p for p in stranded_passengers if p.destination <= floor]
+        if going_up:
+            caller.register_call(floor, "UP", waiting_passengers=going_up)
+        if going_down:
+            caller.register_call(floor, "DOWN", waiting_passengers=going_down)
+
+    def _recall_left_behind(self, floor=None):
+        # 'floor' is where they were left, the car's floor unless it's already on its way
+        if self._left_behind:
+            left_behind, self._left_behind = self._left_behind, None
+            self._que_up_stranded_passengers(left_behind, self.current_floor if floor is None else floor)
+
+    def _set_idle(self, idle: bool):
+        self.idle = idle
+        if self.bank:
+            self.bank.car_moved(self)
+
+    def _clear_call(self, floor: int):
+        if self.floors_waiting.get(floor):
+            self.floors_waiting[floor] = None
+            self.up_calls.discard(floor)
+            self.down_calls.discard(floor)
+            self.waiting_que.discard(floor)
+            if self.bank:
+                self.bank.call_answered(floor, self)
+            else:
+                self.assigned_calls.discard(floor)
+            if self.metrics:
+                self.metrics.call_answered(floor)
 
-    def _create_passenger(self):
+    def _create_passenger(self, destination: int, called_at=None):
         # Admittedly this is more of a function that could be used for testing
-
-        age = randint(0, 99) # I think it's funny some lego sets are for ages X - 99
-        height = 0 # inches
-        weight = 0 # lbs
-
-        # Could use a case statement if written in JAVA
-        if age in range(0, 1):
-            weight = randint(0, 15)
-            height = randint(12, 24) # closish to how tall babies are?
-        elif age in range(1, 7):
-            weight = randint(15, 50)
-            height = randint(20, 50) # closish to toddler - young child height?
-        elif age in range(7, 15):
-            weight = randint(50, 120)
-            height = randint(40, 60)
-        else:
-            weight = randint(100, 350)
-            height = randint(40, 90) # Not sure how many people are above 7ft - 6inches, but i'll assume a few
-        
-        rand_passenger = PASSENGER(age, height, weight)
-        return rand_passenger
+        # The age/height/weight bands live in passenger_generator.AGE_BANDS
+        return PASSENGER(*self.generator.passengers(1)[0], destination, called_at)
+
+    def _random_passengers(self, call) -> list:
+        # Somebody pressed the call button but nobody told us who's waiting, so make up a small group going the way the button says
+        num_of_passengers = self.generator.group_size() # Assuming small group of people on each floor
+        low_floor, high_floor = self.config.min_floor, self.config.max_floor
+        if call.up and not call.down:
+            low_floor = self.current_floor + 1
+        elif call.down and not call.up:
+            high_floor = self.current_floor - 1
+        riders = self.generator.passengers(num_of_passengers)
+        destinations = self.generator.destinations(num_of_passengers, low_floor, high_floor, skip=self.current_floor)
+        return [PASSENGER(*rider, destination) for rider, destination in zip(riders, destinations)]
 
     def _add_passengers(self):
-        passengers_boarded = 0
-
-        if self.floors_waiting[self.current_floor] and self.floors_waiting[self.current_floor].waiting_passengers:
-            for p in self.floors_waiting[self.current_floor].waiting_passengers:
-                self.passengers.append(p)
-                passengers_boarded += 1
+        # The doors opened again on the same floor, so whoever didn't fit last time gets another go
+        self._recall_left_behind()
+        call = self.floors_waiting.get(self.current_floor)
+        if not call:
+            # Only stopped to let people off, nobody pressed the call button here
+            waiting = WaitingRiders()
+        elif call.waiting_passengers:
+            waiting = call.waiting_passengers
         else:
-            num_of_passengers = randint(1,5) # Assuming small group of people on each floor
-            for _ in range(num_of_passengers):
-                self.passengers.append(self._create_passenger())
-                passengers_boarded += 1
+            waiting = WaitingRiders(self._random_passengers(call))
+
+        # Whole groups going to the same floor get on together while there's room, see WaitingRiders.board
+        boarding = waiting.board(self.config.max_weight - self.passengers.total_weight)
+        for p in boarding:
+            slot = self.passengers.append(p)
+            self.press_button(p.destination)
+            if self.metrics:
+                self.metrics.boarded(self.car_number, slot, self.current_floor, p)
+        self._left_behind = list(waiting) if waiting else None
         
-        print(f"\t - {passengers_boarded} Passengers boarded the elevator")
+        self._log(INFO, "boarded", self.current_floor, len(boarding))
 
     def _offload_passengers(self):
         passengers_exited = 0
-        passengers_leaving = []
-        floors_waiting = True if len(self.floors_waiting) > 0 else False
-        # Maybe list comprehension inside of a len > 0 evaluation is too 'Pythonic'?
-        active_buttons = True if len([b for b in self.button_lights if self.button_lights[b] == 'on']) > 0 else False
+        floors_waiting = bool(self.up_calls) or bool(self.down_calls)
+        active_buttons = bool(self.button_lights)
 
         # There are floors still in the travel queue
         if (active_buttons or floors_waiting):
-            for passenger in self.passengers:
-                if randint(1, 4) == 3: # 1/3 chance to get off on a floor
-                    passengers_leaving.append(passenger)
-                    passengers_exited += 1
-
-            if passengers_leaving:
-                for passenger in passengers_leaving:
-                    self.passengers.remove(passenger)
+            # Only the riders going to this floor, straight out of its bucket
+            for slot in self.passengers.alight_floor(self.current_floor):
+                passengers_exited += 1
+                if self.metrics:
+                    self.metrics.alighted(self.car_number, slot)
                         
         elif not floors_waiting and not active_buttons: # If there are no more stops, everyone gets off
-            if self.passengers:
-                for _ in range(len(self.passengers)):
-                    self.passengers.popleft()
-                    passengers_exited += 1
+            passengers_exited = len(self.passengers)
+            if self.metrics:
+                for slot in self.passengers.slots():
+                    self.metrics.alighted(self.car_number, slot)
+            self.passengers.clear()
         
-        print(f"\t - {passengers_exited} Passengers exited on floor")
+        self._log(INFO, "exited", self.current_floor, passengers_exited)
 
     def _open_doors(self):
-        self._print_loading_dots(DOOR_SPEED, "\t- Doors opening")
+        yield from self._wait(self.config.door_speed, "doors_opening")
         self.doors_open = True
         # Proper elevator etiquette suggests it's best to let people off the elevator first\
         if self.passengers:
             self._offload_passengers()
 
-        self._check_internal_destinations(DOOR_SPEED*3)
+        if self.interactive:
+            self._check_internal_destinations(self.config.door_speed*3)
 
     def _close_doors(self):
         # Before closing the doors, allow for passengers to get on
         # I think there are supposed to be sensors on the doors so they don't close while you're boarding
         # Either some elevators aren't that sophisticated, or I've encountered a lot of broken ones before.
         self._add_passengers()
-        self._print_loading_dots(DOOR_SPEED, "\t - Closing Doors")
+        if self.bank:
+            # The load changed, a car that filled up shouldn't be handed new calls (see Bank.car_moved)
+            self.bank.car_moved(self)
+        # Everyone waiting on this floor had the chance to board, so the call is answered.
+        # Somebody who presses the button while the doors are closing makes a new call instead of joining this one
+        self._clear_call(self.current_floor)
+        yield from self._wait(self.config.door_speed, "doors_closing")
         self.doors_open = False
 
     def _update_floor_waiting_queue(self):
@@ -360,22 +568,22 @@ class Elevator:
             while new_calls == 0:
                 try:
                     # max calls should be 2 less than the MAX_FLOOR * 2.  Each floor can have an up or down button, except the top and bottom floors
-                    max_calls = (MAX_FLOOR * 2) - 2
-                    new_calls = int(input(f"No waiting calls in queue. Enter desired number of new calls ({MIN_FLOOR} - {max_calls}) 0 to exit: "))
+                    max_calls = (self.config.max_floor * 2) - 2
+                    new_calls = int(input(f"No waiting calls in queue. Enter desired number of new calls ({self.config.min_floor} - {max_calls}) 0 to exit: "))
                     
                 except:
-                    print(f"input must be a digit between {MIN_FLOOR} - {max_calls} or 0 to exit")
+                    print(f"input must be a digit between {self.config.min_floor} - {max_calls} or 0 to exit")
                 
-                if MIN_FLOOR <= new_calls <= (MAX_FLOOR*2) - 2: 
+                if self.config.min_floor <= new_calls <= (self.config.max_floor*2) - 2: 
                     # Maximum amount of new calls assumes each floor could have both up and down on except top and bottom floor which only have up or down
                     for i in range(1, new_calls + 1):
                         self.call_elevator_interface()
 
                 elif new_calls == 0:
                     # Setting to higher than MAX_FLOOR to exit input loop
-                    new_calls = MAX_FLOOR + 1
+                    new_calls = self.config.max_floor + 1
                 else:
-                    print(f"input must be a digit between {MIN_FLOOR} - {MAX_FLOOR * 2} or 0 to exit")
+                    print(f"input must be a digit between {self.config.min_floor} - {self.config.max_floor * 2} or 0 to exit")
 
     def _check_internal_destinations(self, timeout: int):
         buttons_pressed = []
@@ -388,7 +596,7 @@ class Elevator:
         t = Timer(timeout, lambda: print(f"No button pressed...\nPress Enter to Close Doors"))
         t.start()
         try:
-            buttons_pressed = input(f"\nEnter your destination floor(s) ({MIN_FLOOR} - {MAX_FLOOR}) multiple floors separated by space: ")
+            buttons_pressed = input(f"\nEnter your destination floor(s) ({self.config.min_floor} - {self.config.max_floor}) multiple floors separated by space: ")
             if " " in buttons_pressed:
                 buttons_pressed = buttons_pressed.split(" ")
             else:
@@ -401,46 +609,132 @@ class Elevator:
                 button = int(button)
             except:
                 button = 0
-            if button >= MIN_FLOOR and button <= MAX_FLOOR:
-
-                if button in self.button_lights.keys():
-                    self.button_lights[button] = "on"
+            self.press_button(button)
 
         t.cancel()
     
-    def _print_loading_dots(self, duration: int, travel_string: str, interval=0.25):
-        sys.stdout.write(travel_string)
-        start_time = time.time()
-        while abs(time.time() - start_time) < duration:
-            sys.stdout.write(".")
-            sys.stdout.flush()
-            time.sleep(interval)
-        print()          
+    def _wait(self, duration: float, kind: str):
+        self._log(DEBUG, kind, self.current_floor, duration)
+        yield duration
+
+    def _log(self, level: int, kind: str, floor: int = 0, value=0, render=None):
+        # Checking the level first means a filtered out event costs one comparison, no EVENT or string is built
+        if self.log.wants(level):
+            self.log.emit(EVENT(self.clock.now, self.car_number, kind, floor, value), render if render else EVENT_TEXT[kind])
 
     def _print_panel_lights(self):
+        self._log(INFO, "panel", self.current_floor, len(self.button_lights), self._panel_lights_text)
+
+    def _panel_lights_text(self, event=None) -> str:
         status_char = '-'
         line_display = []
         lights_on = 0
-        for floor, status in self.button_lights.items():
-            if status == 'on':
+        for floor in range(self.config.min_floor, self.config.max_floor + 1):
+            if floor in self.button_lights:
                 status_char = '*'
                 lights_on += 1
             else:
                 status_char = '-'
             line_display.append(f"{floor}: {status_char}")
         
-        print("-"*HEADER_DASHES)
-        print("| " + " | ".join(line_display) + " |")
-        print("-"*HEADER_DASHES)
+        lines = ["-"*HEADER_DASHES, "| " + " | ".join(line_display) + " |", "-"*HEADER_DASHES]
 
         # I love this scene in Elf when he pushes all the buttons in the Empire State Building Elevator
-        if lights_on == MAX_FLOOR:
+        if lights_on == self.config.max_floor:
             christmas_string = f"{'*'*5} IT LOOKS LIKE A CHRISTMAS TREE! {'*'*5}"
-            print(f"|{christmas_string.center(HEADER_DASHES - 2)}|")
-            print("-"*HEADER_DASHES)
+            lines.append(f"|{christmas_string.center(HEADER_DASHES - 2)}|")
+            lines.append("-"*HEADER_DASHES)
+        return "\n".join(lines)
         
 
 if __name__ == '__main__':
-    elevator = Elevator()
-    print("Welcome to the Elevator.\nA Business with ups and downs")
-    elevator.move_elevator()
+    from policies import POLICIES, make_policy # policies.py imports this module
+    defaults = CONFIG()
+    parser = argparse.ArgumentParser(description="Elevator Simulator")
+    parser.add_argument("--min-floor", type=int, default=defaults.min_floor)
+    parser.add_argument("--max-floor", type=int, default=defaults.max_floor)
+    parser.add_argument("--max-weight", type=int, default=defaults.max_weight, help="weight limit in lbs")
+    parser.add_argument("--elevator-fps", type=float, default=defaults.elevator_fps, help="floors travelled per second")
+    parser.add_argument("--door-speed", type=float, default=defaults.door_speed, help="seconds to open or close the doors")
+    parser.add_argument("--real-time", type=float, default=0.0,
+                        help="wall clock seconds per simulated second (0 runs as fast as possible, 1 is real time)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="run headless from a JSONL or CSV trace of calls and panel presses ('-' reads JSONL from stdin)")
+    parser.add_argument("--cars", type=int, default=1, help="number of cars in the elevator bank (headless trace mode only)")
+    parser.add_argument("--seed", type=int, help="seed for the random passengers, the same seed gives the same run")
+    parser.add_argument("--metrics", metavar="FILE", help="write wait/ride time metrics to a JSON or CSV file (headless trace mode only)")
+    parser.add_argument("--checkpoint", nargs=2, metavar=("TIME", "FILE"),
+                        help="snapshot the elevator once it has answered every call up to TIME, then carry on (headless trace mode, single car)")
+    parser.add_argument("--resume", metavar="FILE",
+                        help="carry on a trace from a --checkpoint snapshot instead of from the start, building settings come from the snapshot")
+    parser.add_argument("--policy", default="default", choices=("default",) + tuple(POLICIES), help="scheduling policy (see policies.py)")
+    parser.add_argument("--quiet", action="store_true", help="don't print the floor by floor play by play")
+    parser.add_argument("--dashboard", type=float, nargs="?", const=DEFAULT_FPS, metavar="FPS",
+                        help="live dashboard instead of the play by play, redrawn up to FPS times a second (headless trace mode only)")
+    parser.add_argument("--log", metavar="FILE", help="write every event to a JSONL file, or a compact binary file if it ends in .bin")
+    args = parser.parse_args()
+
+    config = CONFIG(args.min_floor, args.max_floor, args.max_weight, args.elevator_fps, args.door_speed)
+    try:
+        check_config(config)
+    except ValueError as error:
+        parser.error(str(error))
+    policy = make_policy(args.policy, config)
+
+    # Quiet only turns off the terminal play by play, a --log file still gets every event
+    # The dashboard takes over the terminal, so the play by play would only scribble over it
+    log = EventLog(echo=not (args.quiet or args.dashboard), sink=open_sink(args.log) if args.log else None)
+
+    if (args.checkpoint or args.resume) and (not args.trace or args.cars > 1):
+        parser.error("--checkpoint and --resume need --trace and a single car")
+    if args.dashboard is not None and not args.trace:
+        parser.error("--dashboard needs --trace, the interactive prompts would draw over it")
+
+    if args.trace and (args.checkpoint or args.resume):
+        import snapshot # snapshot.py imports this module too
+        events = read_trace(args.trace)
+        if args.resume:
+            with snapshot.load_snapshot(args.resume) as loaded:
+                # The snapshot's building, not the command line's (the policy's cost table depends on it)
+                policy = make_policy(args.policy, loaded.config)
+                elevator = snapshot.restore(loaded, args.real_time, log=log, policy=policy)
+                trace_time = loaded.trace_time if loaded.trace_time is not None else loaded.time
+                next_event_time = loaded.next_event_time
+            events = (event for event in events if event.time > trace_time)
+        else:
+            elevator = Elevator(SimClock(real_time=args.real_time), interactive=False, seed=args.seed, config=config, log=log, policy=policy)
+            next_event_time = None
+        metrics = attach_metrics(elevator) if args.metrics else None
+        dashboard = Dashboard(elevator, args.dashboard).start() if args.dashboard else None
+
+        if args.checkpoint:
+            checkpoint_time = float(args.checkpoint[0])
+            events, next_event_time = snapshot.run_to_checkpoint(elevator, events, checkpoint_time)
+            snapshot.write_snapshot(elevator, args.checkpoint[1], elevator.clock.now, next_event_time)
+        snapshot.resume_trace(elevator, events, next_event_time)
+        if dashboard:
+            dashboard.close()
+        print(f"Trace finished after {elevator.clock.now:.1f} simulated seconds")
+        if metrics:
+            metrics.write(args.metrics)
+    elif args.trace:
+        clock = SimClock(real_time=args.real_time)
+        if args.cars > 1:
+            from bank import Bank # bank.py imports this module, so only import it when it's needed
+            elevator = Bank(args.cars, clock, args.seed, config, log=log, policy=policy)
+        else:
+            elevator = Elevator(clock, interactive=False, seed=args.seed, config=config, log=log, policy=policy)
+        metrics = attach_metrics(elevator) if args.metrics else None
+        dashboard = Dashboard(elevator, args.dashboard).start() if args.dashboard else None
+
+        run_trace(elevator, read_trace(args.trace))
+        if dashboard:
+            dashboard.close()
+        print(f"Trace finished after {elevator.clock.now:.1f} simulated seconds")
+        if metrics:
+            metrics.write(args.metrics)
+    else:
+        elevator = Elevator(SimClock(real_time=args.real_time), seed=args.seed, config=config, log=log, policy=policy)
+        print("Welcome to the Elevator.\nA Business with ups and downs")
+        elevator.move_elevator()
+    log.close()
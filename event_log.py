@@ -0,0 +1,104 @@
+# event_log.py
+import json
+import struct
+import sys
+from collections import namedtuple
+
+# Structured logging for the simulator, instead of printing at every stop.
+# Every log line is a small typed EVENT record. Records are buffered and written to a sink (JSONL or a
+# compact binary file) in batches, and the human readable text is only built when echo is turned on.
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+QUIET = 100 # Nothing is at this level, so nothing gets logged
+
+EVENT = namedtuple("Event", "time car kind floor value")
+# 'time' is simulated seconds, 'car' is the car number in a bank (0 for a single elevator)
+# 'kind' is one of EVENT_KINDS, 'floor' and 'value' depend on the kind (i.e. 'boarded' has how many people in value)
+
+EVENT_KINDS = (
+    "at_floor", "called", "sweep", "panel", "load", "overweight", "stranded", "next_floor",
+    "going_up", "going_down", "ding", "doors_opening", "doors_closing", "exited", "boarded",
+    "checking_up", "checking_down",
+)
+KIND_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self.file = open(path, "w")
+
+    def write_batch(self, events: list):
+        self.file.write("".join(json.dumps(event._asdict()) + "\n" for event in events))
+
+    def close(self):
+        self.file.close()
+
+
+class BinarySink:
+    """Description: Fixed size little endian records - time (double), car (ushort), kind code (ubyte), floor (int), value (double)"""
+    RECORD = struct.Struct("<dHBid")
+
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+
+    def write_batch(self, events: list):
+        pack = self.RECORD.pack
+        self.file.write(b"".join(pack(time, car, KIND_CODES[kind], floor, value) for time, car, kind, floor, value in events))
+
+    def close(self):
+        self.file.close()
+
+
+def open_sink(path: str):
+    """Description: BinarySink for paths ending in .bin, JsonlSink for anything else"""
+    return BinarySink(path) if path.lower().endswith(".bin") else JsonlSink(path)
+
+
+def read_binary(path: str):
+    """Description: Lazily read back the EVENTs a BinarySink wrote"""
+    record_size = BinarySink.RECORD.size
+    with open(path, "rb") as log_file:
+        while True:
+            chunk = log_file.read(record_size * 4096)
+            if not chunk:
+                break
+            for time, car, code, floor, value in BinarySink.RECORD.iter_unpack(chunk[:len(chunk) - len(chunk) % record_size]):
+                yield EVENT(time, car, EVENT_KINDS[code], floor, value)
+
+
+class EventLog:
+    def __init__(self, level: int = DEBUG, echo: bool = True, sink=None, batch_size: int = 4096, stream=None):
+        """Description: level - events below this level are dropped
+        echo - write human readable text to 'stream' (stdout by default), turn off for quiet mode
+        sink - where the records go in batches of batch_size (see open_sink), or None to not keep them"""
+        self.level = level
+        self.echo = echo
+        self.sink = sink
+        self.batch_size = batch_size
+        self.stream = stream # None means whatever sys.stdout is at the time
+        self._buffer = []
+
+    def wants(self, level: int) -> bool:
+        """Description: Whether an event at 'level' would go anywhere. Check this before building one"""
+        return level >= self.level and (self.echo or self.sink is not None)
+
+    def emit(self, event: EVENT, render=None):
+        """Description: Log an event. 'render' turns it into text, and is only called when echo is on"""
+        if self.sink is not None:
+            self._buffer.append(event)
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+        if self.echo and render:
+            (self.stream or sys.stdout).write(render(event) + "\n")
+
+    def flush(self):
+        if self._buffer:
+            self.sink.write_batch(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        if self.sink is not None:
+            self.flush()
+            self.sink.close()
@@ -0,0 +1,113 @@
+# floor_index.py
+from collections import OrderedDict
+
+# Indexes for the floors the elevator needs to stop at.
+# FloorSet keeps one bit per floor in a Python int, so 'next stop above floor X' is a couple of
+# word-at-a-time bit operations instead of walking every floor in the building.
+# CallQueue keeps the order calls came in while still answering 'is this floor in the queue' in O(1).
+
+
+class FloorSet:
+    __slots__ = ("min_floor", "max_floor", "bits")
+
+    def __init__(self, min_floor: int, max_floor: int, floors=()):
+        self.min_floor = min_floor
+        self.max_floor = max_floor
+        self.bits = 0 # bit 0 is min_floor
+        for floor in floors:
+            self.add(floor)
+
+    def add(self, floor: int):
+        self.bits |= 1 << (floor - self.min_floor)
+
+    def discard(self, floor: int):
+        if floor in self:
+            self.bits ^= 1 << (floor - self.min_floor)
+
+    def update(self, other: "FloorSet"):
+        self.bits |= other.bits
+
+    def clear(self):
+        self.bits = 0
+
+    def lowest(self) -> int:
+        return (self.bits & -self.bits).bit_length() - 1 + self.min_floor
+
+    def highest(self) -> int:
+        return self.bits.bit_length() - 1 + self.min_floor
+
+    def beyond(self, floor: int, direction: str) -> "FloorSet":
+        """Description: Floors in the set from 'floor' onwards in 'direction' ('UP' or 'DOWN'), including 'floor' itself"""
+        on_the_way = FloorSet(self.min_floor, self.max_floor)
+        offset = floor - self.min_floor
+        if direction == "UP":
+            offset = max(offset, 0)
+            on_the_way.bits = self.bits >> offset << offset
+        elif offset >= 0:
+            on_the_way.bits = self.bits & ((1 << (offset + 1)) - 1)
+        return on_the_way
+
+    def next_stop(self, floor: int, direction: str):
+        """Description: Closest floor in the set from 'floor' onwards in 'direction', or None if there isn't one"""
+        on_the_way = self.beyond(floor, direction)
+        if not on_the_way:
+            return None
+        return on_the_way.lowest() if direction == "UP" else on_the_way.highest()
+
+    def count_between(self, low: int, high: int) -> int:
+        """Description: How many floors in the set are between 'low' and 'high', including both ends"""
+        low, high = max(low, self.min_floor), min(high, self.max_floor)
+        if low > high:
+            return 0
+        return (self.bits >> (low - self.min_floor) & ((1 << (high - low + 1)) - 1)).bit_count()
+
+    def __contains__(self, floor: int) -> bool:
+        return self.min_floor <= floor <= self.max_floor and bool(self.bits >> (floor - self.min_floor) & 1)
+
+    def __iter__(self):
+        # Lowest floor first
+        bits = self.bits
+        while bits:
+            lowest_bit = bits & -bits
+            yield lowest_bit.bit_length() - 1 + self.min_floor
+            bits ^= lowest_bit
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.bits != 0
+
+    def __repr__(self) -> str:
+        return f"FloorSet({list(self)})"
+
+
+class CallQueue:
+    """Description: First come first served queue of floors. Each floor is only in the queue once"""
+
+    def __init__(self, floors=()):
+        self._floors = OrderedDict.fromkeys(floors)
+
+    def append(self, floor: int):
+        self._floors[floor] = None
+
+    def popleft(self) -> int:
+        return self._floors.popitem(last=False)[0]
+
+    def remove(self, floor: int):
+        del self._floors[floor]
+
+    def discard(self, floor: int):
+        self._floors.pop(floor, None)
+
+    def __contains__(self, floor: int) -> bool:
+        return floor in self._floors
+
+    def __iter__(self):
+        return iter(self._floors)
+
+    def __len__(self) -> int:
+        return len(self._floors)
+
+    def __repr__(self) -> str:
+        return f"CallQueue({list(self._floors)})"
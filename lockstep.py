@@ -0,0 +1,560 @@
+# lockstep.py
+import argparse
+import math
+import time
+
+from elevator import CONFIG, LOAD_BYPASS, Elevator, check_config
+from event_log import EventLog
+from metrics import attach as attach_metrics
+from passenger_generator import PassengerGenerator
+from sim_clock import SimClock
+from traces import run_trace
+from traffic import HOUR, poisson_calls
+
+# NumPy is required here, unlike the rest of the simulator
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Lockstep engine for Monte Carlo studies - thousands of independent single car buildings advanced together.
+# Instead of one Elevator object per building, every piece of state is a NumPy column with one row per building
+# (floor, direction, load, call and panel button bitmaps...) and every step moves all of them one stop at a time:
+# pick the next stop for every car at once, travel, open the doors, let people off, board, close.
+#
+# The rules are the ones Elevator.goto_floor follows under the LOOK policy (policies.Look), whose next stop only
+# depends on the button bitmaps. Riders come from the same PassengerGenerator stream as the reference class, so
+# building i here matches Elevator(seed=seeds[i], policy=Look(config)) run on the same calls - check() runs both.
+#
+# python lockstep.py --buildings 2000 --hours 8 --check 20
+
+UP = 1
+DOWN = -1
+MAX_FLOORS = 64 # One bit per floor in a uint64
+NO_QUEUE = 2 ** 62 # Queue order for a destination nobody is waiting for
+NO_RIDER = -1 # End of a linked list of riders in the pool
+LEFT_BEHIND_ORDER = 2 ** 41 # Added to the order of down queues when riders who didn't fit call again (up first, like the elevator)
+RESULT_FIELDS = ("sim_seconds", "passengers_delivered", "floors_travelled", "door_cycles", "wait_mean", "ride_mean", "current_floor")
+
+
+class LockstepSim:
+    def __init__(self, calls, seeds, config=None, pool_size: int = 4096):
+        """Description: calls - one iterable of TRACE_EVENT calls per building, each with a destination (i.e. traffic.poisson_calls)
+        seeds - the passenger seed for each building, the same seed the reference Elevator would get
+        pool_size - room for this many waiting riders to start with, the pool doubles when it runs out"""
+        if np is None:
+            raise ImportError("lockstep.py needs numpy installed")
+        self.config = config if config else CONFIG()
+        check_config(self.config)
+        floors = self.config.max_floor - self.config.min_floor + 1
+        if floors > MAX_FLOORS:
+            raise ValueError(f"The lockstep engine handles up to {MAX_FLOORS} floors, got {floors}")
+        calls = [list(building_calls) for building_calls in calls]
+        seeds = list(seeds)
+        if len(calls) != len(seeds):
+            raise ValueError(f"Need one seed per building, got {len(seeds)} seeds for {len(calls)} buildings")
+
+        self.buildings = buildings = len(calls)
+        self.floors = floors
+        self._bits = np.array([1 << floor for floor in range(floors)], dtype=np.uint64)
+        # floors from this one up / from this one down, including itself (FloorSet.beyond)
+        self._up_masks = np.array([((1 << floors) - 1) >> floor << floor for floor in range(floors)], dtype=np.uint64)
+        self._down_masks = np.array([(1 << (floor + 1)) - 1 for floor in range(floors)], dtype=np.uint64)
+
+        self._load_calls(calls, seeds)
+
+        # One row per building
+        self.current_floor = np.zeros(buildings, dtype=np.int64) # Offset from min_floor
+        starts_up = self.config.min_floor <= self.config.max_floor / 2 - 1 # Same default as Elevator.__init__
+        self.direction = np.full(buildings, UP if starts_up else DOWN, dtype=np.int8)
+        self.request_dir = np.zeros(buildings, dtype=np.int8) # 0 until the first decision, like Elevator.request_dir = ""
+        self.time = np.zeros(buildings)
+        self.load = np.zeros(buildings, dtype=np.int64)
+        self.button_lights = np.zeros(buildings, dtype=np.uint64)
+        self.up_calls = np.zeros(buildings, dtype=np.uint64)
+        self.down_calls = np.zeros(buildings, dtype=np.uint64)
+        self.finished = np.zeros(buildings, dtype=bool)
+        self.floors_travelled = np.zeros(buildings, dtype=np.int64)
+        self.door_cycles = np.zeros(buildings, dtype=np.int64)
+        self.delivered = np.zeros(buildings, dtype=np.int64)
+        self.boarded = np.zeros(buildings, dtype=np.int64)
+        self.wait_total = np.zeros(buildings)
+        self.ride_total = np.zeros(buildings)
+        # Riders who didn't fit at the last stop, linked through the pool in the order they call again when the car leaves
+        self.left_count = np.zeros(buildings, dtype=np.int64)
+        self.left_head = np.full(buildings, NO_RIDER, dtype=np.int64)
+        self.left_tail = np.full(buildings, NO_RIDER, dtype=np.int64)
+
+        # Building x floor
+        self.riding_count = np.zeros((buildings, floors), dtype=np.int64) # Riders going to each floor
+        self.riding_weight = np.zeros((buildings, floors), dtype=np.int64)
+        self.board_time_total = np.zeros((buildings, floors)) # Sum of when the riders going to each floor boarded
+
+        # Building x floor x destination - the WaitingRiders of every call, as linked lists of riders in the pool.
+        # Only heads and totals are kept per queue, so a long queue costs pool slots instead of widening every queue
+        self.queue_count = np.zeros((buildings, floors, floors), dtype=np.int32)
+        self.queue_weight = np.zeros((buildings, floors, floors), dtype=np.int32)
+        self.queue_order = np.full((buildings, floors, floors), NO_QUEUE, dtype=np.int64)
+        self.queue_head = np.full((buildings, floors, floors), NO_RIDER, dtype=np.int32)
+        self.queue_tail = np.full((buildings, floors, floors), NO_RIDER, dtype=np.int32)
+        self._queue_sequence = 0
+
+        # Rider pool - one slot per waiting rider from every building, 'rider_next' links them into their queue
+        self.rider_weight = np.zeros(pool_size, dtype=np.int64)
+        self.rider_destination = np.zeros(pool_size, dtype=np.int64)
+        self.rider_called = np.zeros(pool_size) # When they pressed the call button (Passenger.called_at)
+        self.rider_next = np.full(pool_size, NO_RIDER, dtype=np.int64)
+        self._free = np.arange(pool_size - 1, -1, -1, dtype=np.int64) # Stack of free slots, taken from the end
+        self._free_count = pool_size
+        self.steps = 0
+
+    #### Public Functions ####
+    def run(self):
+        """Description: Step every building until each one has answered all its calls and gone home"""
+        while self.step():
+            pass
+        return self
+
+    def step(self) -> bool:
+        """Description: Every building that isn't finished makes its next move. Returns False once they're all finished"""
+        rows = np.flatnonzero(~self.finished)
+        if not len(rows):
+            return False
+        self.steps += 1
+        self._register(rows, self.time[rows])
+        stops = self._next_stops(rows)
+
+        moving = stops >= 0
+        self._stop(rows[moving], stops[moving])
+
+        waiting = rows[~moving]
+        more_calls = self._ptr[waiting] < self._end[waiting]
+        # Idle until the next call comes in
+        idle = waiting[more_calls]
+        self.time[idle] = self._call_times[self._ptr[idle]]
+        # Out of calls - back to the lobby and done, like the end of Elevator._run
+        done = waiting[~more_calls]
+        lobby = np.zeros(len(done), dtype=np.int64)
+        going_home = (self.current_floor[done] != 0) | (((self.up_calls[done] | self.down_calls[done] | self.button_lights[done]) & self._bits[0]) != 0)
+        self._stop(done[going_home], lobby[going_home])
+        self.finished[done] = True
+        return True
+
+    def results(self) -> dict:
+        """Description: One array per RESULT_FIELDS entry, one value per building (floors as building floor numbers)"""
+        delivered = np.maximum(self.delivered, 1)
+        boarded = np.maximum(self.boarded, 1)
+        return {
+            "sim_seconds": self.time.copy(),
+            "passengers_delivered": self.delivered.copy(),
+            "floors_travelled": self.floors_travelled.copy(),
+            "door_cycles": self.door_cycles.copy(),
+            "wait_mean": np.where(self.boarded > 0, self.wait_total / boarded, 0.0),
+            "ride_mean": np.where(self.delivered > 0, self.ride_total / delivered, 0.0),
+            "current_floor": self.current_floor + self.config.min_floor,
+        }
+
+    #### Private functions ####
+    def _load_calls(self, calls: list, seeds: list):
+        # Every building's calls go into flat columns, building after building, with a read pointer per building
+        min_floor, max_floor = self.config.min_floor, self.config.max_floor
+        counts = np.array([len(building_calls) for building_calls in calls], dtype=np.int64)
+        self._end = np.cumsum(counts)
+        self._ptr = self._end - counts
+        total = int(counts.sum())
+
+        floors = np.empty(total + 1, dtype=np.int64) # One spare row past the end so a finished pointer can still be read
+        destinations = np.empty(total + 1, dtype=np.int64)
+        going_up = np.zeros(total + 1, dtype=bool)
+        weights = np.zeros(total + 1, dtype=np.int64)
+        # When the trace feeder actually registers each call - feed_trace waits 'event.time - now', which can round
+        call_times = np.full(total + 1, np.inf)
+        row = 0
+        for building, (building_calls, seed) in enumerate(zip(calls, seeds)):
+            fed_at = 0.0
+            for event in building_calls:
+                if event.type != "call" or event.destination is None or event.destination == event.floor \
+                        or not (min_floor <= event.floor <= max_floor and min_floor <= event.destination <= max_floor):
+                    raise ValueError(f"Building {building}: the lockstep engine needs calls with a destination in the building, got {event}")
+                if event.time > fed_at:
+                    # Not just event.time - feed_trace sleeps 'event.time - now' from the last call it applied, and
+                    # now + (time - now) can be an ulp off from time. Doing the same sum keeps the call times identical
+                    fed_at = fed_at + (event.time - fed_at)
+                call_times[row] = fed_at
+                floors[row] = event.floor - min_floor
+                destinations[row] = event.destination - min_floor
+                # The bottom floor only has an up button and the top floor only has a down button (Elevator.register_call)
+                going_up[row] = event.floor == min_floor or (event.floor != max_floor and event.direction.upper() == "UP")
+                row += 1
+            weights[row - len(building_calls):row] = _rider_weights(seed, len(building_calls))
+
+        self._call_times = call_times
+        self._call_floors = floors
+        self._call_destinations = destinations
+        self._call_up = going_up
+        self._call_weights = weights
+
+    def _register(self, rows, until):
+        # Apply every call up to 'until' for each building in 'rows', one call per building per pass
+        while len(rows):
+            ptr = self._ptr[rows]
+            due = (ptr < self._end[rows]) & (self._call_times[ptr] <= until)
+            rows, until, ptr = rows[due], until[due], ptr[due]
+            if not len(rows):
+                return
+            self._ptr[rows] += 1
+            floors = self._call_floors[ptr]
+            bits = self._bits[floors]
+            up = self._call_up[ptr]
+            self.up_calls[rows[up]] |= bits[up]
+            self.down_calls[rows[~up]] |= bits[~up]
+            self._add_riders(rows, floors, self._call_destinations[ptr], self._call_weights[ptr], self._call_times[ptr])
+
+    def _add_riders(self, rows, floors, destinations, weights, called):
+        # One new rider per building onto the back of their destination's queue
+        slots = self._allocate(len(rows))
+        self.rider_weight[slots] = weights
+        self.rider_destination[slots] = destinations
+        self.rider_called[slots] = called
+        self._append(rows, floors, destinations, slots)
+
+    def _append(self, rows, floors, destinations, slots):
+        # Link one pooled rider per building onto the back of their queue. Every queue array is read and written
+        # through one flat index, it's a lot cheaper than indexing the three axes each time
+        queues = (rows * self.floors + floors) * self.floors + destinations
+        count, head, tail = self.queue_count.reshape(-1), self.queue_head.reshape(-1), self.queue_tail.reshape(-1)
+        new = count[queues] == 0
+        self.rider_next[slots] = NO_RIDER
+        self.rider_next[tail[queues[~new]]] = slots[~new]
+        head[queues[new]] = slots[new]
+        tail[queues] = slots
+        self.queue_order.reshape(-1)[queues[new]] = self._queue_sequence
+        self._queue_sequence += 1
+        count[queues] += 1
+        self.queue_weight.reshape(-1)[queues] += self.rider_weight[slots]
+
+    def _clear_queues(self, rows, floors, destinations):
+        queues = (rows * self.floors + floors) * self.floors + destinations
+        self.queue_count.reshape(-1)[queues] = 0
+        self.queue_weight.reshape(-1)[queues] = 0
+        self.queue_head.reshape(-1)[queues] = NO_RIDER
+        self.queue_tail.reshape(-1)[queues] = NO_RIDER
+        self.queue_order.reshape(-1)[queues] = NO_QUEUE
+
+    def _allocate(self, count: int):
+        # 'count' free pool slots. When it runs out only the flat pool doubles, the per queue arrays stay the same size
+        if count > self._free_count:
+            size = len(self.rider_weight)
+            grown = max(size * 2, size + count)
+            self.rider_weight = np.concatenate((self.rider_weight, np.zeros(grown - size, dtype=np.int64)))
+            self.rider_destination = np.concatenate((self.rider_destination, np.zeros(grown - size, dtype=np.int64)))
+            self.rider_called = np.concatenate((self.rider_called, np.zeros(grown - size)))
+            self.rider_next = np.concatenate((self.rider_next, np.full(grown - size, NO_RIDER, dtype=np.int64)))
+            free = np.empty(grown, dtype=np.int64)
+            free[:grown - size] = np.arange(grown - 1, size - 1, -1)
+            free[grown - size:grown - size + self._free_count] = self._free[:self._free_count]
+            self._free = free
+            self._free_count += grown - size
+        self._free_count -= count
+        return self._free[self._free_count:self._free_count + count].copy()
+
+    def _release(self, slots):
+        self._free[self._free_count:self._free_count + len(slots)] = slots
+        self._free_count += len(slots)
+
+    def _walk(self, heads, counts):
+        # Every slot in the linked lists starting at 'heads', 'counts' riders long, and which list each one is in
+        lists, walked = [], []
+        owners = np.arange(len(heads))
+        while len(heads):
+            lists.append(owners)
+            walked.append(heads)
+            more = counts > 1
+            heads, counts, owners = self.rider_next[heads[more]], counts[more] - 1, owners[more]
+        if not walked:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(lists), np.concatenate(walked)
+
+    def _next_stops(self, rows):
+        """Description: policies.Look.next_stop for every building in 'rows' at once, -1 where there's nothing to do"""
+        floors = self.current_floor[rows]
+        buttons = self.button_lights[rows]
+        # A car past LOAD_BYPASS only stops to let people off (Elevator.has_room)
+        has_room = self.load[rows] < self.config.max_weight * LOAD_BYPASS
+        up_calls = np.where(has_room, self.up_calls[rows], np.uint64(0))
+        down_calls = np.where(has_room, self.down_calls[rows], np.uint64(0))
+        request_dir = self.request_dir[rows]
+        direction = self.direction[rows]
+
+        stops = np.full(len(rows), -1, dtype=np.int64)
+        deciding = np.ones(len(rows), dtype=bool)
+        for _ in range(2):
+            heading = np.where(request_dir != 0, request_dir, direction)
+            going_up = heading == UP
+            masks = np.where(going_up, self._up_masks[floors], self._down_masks[floors])
+            ahead = (buttons | np.where(going_up, up_calls, down_calls)) & masks
+            turn = np.where(going_up, down_calls, up_calls) & masks
+            # Nearest stop ahead, otherwise the farthest call going back the other way
+            has_ahead = ahead != 0
+            stop = np.where(has_ahead, np.where(going_up, _lowest(ahead), _highest(ahead)),
+                            np.where(going_up, _highest(turn), _lowest(turn)))
+            found = has_ahead | (turn != 0)
+            taken = deciding & found
+            stops[taken] = stop[taken]
+            request_dir = np.where(deciding, np.where(found, heading, -heading), request_dir).astype(np.int8)
+            deciding &= ~found
+
+        self.request_dir[rows] = request_dir
+        return stops
+
+    def _stop(self, rows, stops):
+        # Elevator.goto_floor for each building in 'rows' - travel, doors, off, on, doors
+        if not len(rows):
+            return
+        config = self.config
+        floors = self.current_floor[rows]
+
+        # Riders who didn't fit last time call again as the car leaves (Elevator.travel_to)
+        moving = stops != floors
+        self._recall_left_behind(rows[moving], self.time[rows[moving]])
+
+        self.direction[rows] = np.where(stops > floors, UP, np.where(stops < floors, DOWN, self.direction[rows]))
+        distance = np.abs(stops - floors)
+        self.floors_travelled[rows] += distance
+        arrived = np.where(distance > 0, self.time[rows] + distance / config.elevator_fps, self.time[rows])
+        self.current_floor[rows] = stops
+        self.door_cycles[rows] += 1
+
+        doors_open = arrived + config.door_speed
+        self._register(rows, doors_open)
+        self._offload(rows, stops, doors_open)
+        # Or get another go if the doors opened again on the same floor (Elevator._add_passengers)
+        self._recall_left_behind(rows, doors_open)
+        self._board(rows, stops, doors_open)
+        # The call is answered once everyone had the chance to board, calls while the doors close are new ones
+        bits = ~self._bits[stops]
+        self.up_calls[rows] &= bits
+        self.down_calls[rows] &= bits
+
+        doors_closed = doors_open + config.door_speed
+        self._register(rows, doors_closed)
+        self.button_lights[rows] &= bits
+        self.time[rows] = doors_closed
+
+    def _recall_left_behind(self, rows, now):
+        # The riders held back by _leave_behind queue up again on the car's floor and press its buttons
+        calling = self.left_count[rows] > 0
+        rows, now = rows[calling], now[calling]
+        if not len(rows):
+            return
+        floors = self.current_floor[rows]
+        counts = self.left_count[rows]
+        riders = self.left_head[rows]
+        up = np.zeros(len(rows), dtype=bool)
+        down = np.zeros(len(rows), dtype=bool)
+        for position in range(counts.max()):
+            again = np.flatnonzero(counts > position)
+            slots = riders[again]
+            riders[again] = self.rider_next[slots] # Before _append relinks them
+            destinations = self.rider_destination[slots]
+            up[again] |= destinations > floors[again]
+            down[again] |= destinations < floors[again]
+            self._append(rows[again], floors[again], destinations, slots)
+
+        bits = self._bits[floors]
+        self.up_calls[rows[up]] |= bits[up]
+        self.down_calls[rows[down]] |= bits[down]
+        self.left_count[rows] = 0
+        self.left_head[rows] = NO_RIDER
+        self.left_tail[rows] = NO_RIDER
+
+    def _offload(self, rows, floors, now):
+        getting_off = self.riding_count[rows, floors]
+        self.delivered[rows] += getting_off
+        self.ride_total[rows] += getting_off * now - self.board_time_total[rows, floors]
+        self.load[rows] -= self.riding_weight[rows, floors]
+        self.riding_count[rows, floors] = 0
+        self.riding_weight[rows, floors] = 0
+        self.board_time_total[rows, floors] = 0.0
+
+    def _board(self, rows, floors, now):
+        # WaitingRiders.board for every building at once. Whole destination queues go first, in the order they
+        # started, then whoever fits from the front of the queues left over
+        room = self.config.max_weight - self.load[rows]
+        waiting = self.queue_count[rows, floors] > 0
+        order = np.argsort(np.where(waiting, self.queue_order[rows, floors], NO_QUEUE), axis=1, kind="stable")
+
+        for rank in range(self.floors):
+            destinations = order[:, rank]
+            weight = self.queue_weight[rows, floors, destinations]
+            fits = (self.queue_count[rows, floors, destinations] > 0) & (weight < room)
+            if fits.any():
+                room -= np.where(fits, weight, 0)
+                self._board_queue(rows[fits], floors[fits], destinations[fits], now[fits])
+
+        blocked = np.zeros(len(rows), dtype=bool)
+        for rank in range(self.floors):
+            destinations = order[:, rank]
+            active = np.flatnonzero(~blocked & (self.queue_count[rows, floors, destinations] > 0))
+            if not len(active):
+                continue
+            boarding = active
+            while len(boarding):
+                building, floor, destination = rows[boarding], floors[boarding], destinations[boarding]
+                head = self.queue_head[building, floor, destination]
+                front = self.rider_weight[head]
+                takes = (self.queue_count[building, floor, destination] > 0) & (front < room[boarding])
+                boarding, building, floor, destination, head, front = (
+                    boarding[takes], building[takes], floor[takes], destination[takes], head[takes], front[takes])
+                room[boarding] -= front
+                self.queue_head[building, floor, destination] = self.rider_next[head]
+                self.queue_count[building, floor, destination] -= 1
+                self.queue_weight[building, floor, destination] -= front
+                self._release(head)
+                self._ride(building, destination, np.ones(len(building), dtype=np.int64), front, now[boarding],
+                           now[boarding] - self.rider_called[head])
+
+            left = self.queue_count[rows[active], floors[active], destinations[active]] > 0
+            blocked[active[left]] = True
+            emptied = active[~left]
+            self._clear_queues(rows[emptied], floors[emptied], destinations[emptied])
+
+        self._leave_behind(rows, floors)
+
+    def _board_queue(self, rows, floors, destinations, now):
+        counts = self.queue_count[rows, floors, destinations]
+        owners, slots = self._walk(self.queue_head[rows, floors, destinations], counts)
+        waited = np.bincount(owners, weights=now[owners] - self.rider_called[slots], minlength=len(rows))
+        self._ride(rows, destinations, counts, self.queue_weight[rows, floors, destinations], now, waited)
+        self._release(slots)
+        self._clear_queues(rows, floors, destinations)
+
+    def _ride(self, rows, destinations, count, weight, now, waited):
+        # 'count' riders weighing 'weight' in total board and press their floor, 'waited' is their waits added up
+        self.riding_count[rows, destinations] += count
+        self.riding_weight[rows, destinations] += weight
+        self.board_time_total[rows, destinations] += count * now
+        self.load[rows] += weight
+        self.button_lights[rows] |= self._bits[destinations]
+        self.boarded[rows] += count
+        self.wait_total[rows] += waited
+
+    def _leave_behind(self, rows, floors):
+        # Whoever is still waiting steps back from the doors and calls again once the car moves on - queue by queue,
+        # going up first and then down (Elevator._que_up_stranded_passengers). Whole queues are spliced onto the
+        # building's left behind list, the riders keep their pool slots
+        waiting = self.queue_count[rows, floors] > 0
+        left = np.flatnonzero(waiting.any(axis=1))
+        if not len(left):
+            return
+        rows, floors, waiting = rows[left], floors[left], waiting[left]
+        going_down = np.arange(self.floors)[None, :] < floors[:, None]
+        order = np.argsort(np.where(waiting, going_down * LEFT_BEHIND_ORDER + self.queue_order[rows, floors], NO_QUEUE),
+                           axis=1, kind="stable")
+        for rank in range(self.floors):
+            destinations = order[:, rank]
+            counts = self.queue_count[rows, floors, destinations]
+            queued = counts > 0
+            if not queued.any():
+                break
+            building, floor, destination = rows[queued], floors[queued], destinations[queued]
+            heads = self.queue_head[building, floor, destination]
+            started = self.left_count[building] > 0
+            self.rider_next[self.left_tail[building[started]]] = heads[started]
+            self.left_head[building[~started]] = heads[~started]
+            self.left_tail[building] = self.queue_tail[building, floor, destination]
+            self.left_count[building] += counts[queued]
+            self._clear_queues(building, floor, destination)
+
+
+def _lowest(bits):
+    # Floor offset of the lowest set bit (0 where there are none)
+    return _bit_index(bits & (~bits + np.uint64(1)))
+
+
+def _highest(bits):
+    # Floor offset of the highest set bit - smear it down through every lower bit, then keep just the top one
+    for shift in (1, 2, 4, 8, 16, 32):
+        bits = bits | (bits >> np.uint64(shift))
+    return _bit_index(bits ^ (bits >> np.uint64(1)))
+
+
+def _bit_index(power):
+    # Powers of two are exact as doubles, so log2 gives the bit number straight back
+    return np.log2(np.maximum(power, np.uint64(1)).astype(np.float64)).astype(np.int64)
+
+
+def _rider_weights(seed, count: int) -> list:
+    # The same riders Elevator._create_passenger would draw, one per call. Taking them a block at a time keeps
+    # the stream identical to taking them one by one
+    generator = PassengerGenerator(seed)
+    block_size = generator.getstate()["block_size"]
+    weights = []
+    for start in range(0, count, block_size):
+        weights.extend(weight for _, _, weight in generator.passengers(min(block_size, count - start)))
+    return weights
+
+
+def building_traffic(config, buildings: int, seed: int, hours: float, call_rate: float, trip="interfloor") -> list:
+    """Description: One list of Poisson calls per building, building i seeded with seed + i (the same seed as its passengers)"""
+    return [list(poisson_calls(config, call_rate, trip, seed + building, 0.0, hours * HOUR)) for building in range(buildings)]
+
+
+def reference_run(calls, seed, config=None) -> dict:
+    """Description: The same building on the Elevator class - LOOK policy, headless, on its own clock"""
+    from policies import Look # policies.py imports the elevator, only needed for the check
+    config = config if config else CONFIG()
+    elevator = Elevator(SimClock(), interactive=False, seed=seed, config=config, log=EventLog(echo=False), policy=Look(config))
+    metrics = attach_metrics(elevator)
+    run_trace(elevator, calls)
+    summary = metrics.summary()
+    summary["current_floor"] = elevator.current_floor
+    return {field: summary[field] for field in RESULT_FIELDS}
+
+
+def check(sim: LockstepSim, calls: list, seeds: list, buildings=None) -> list:
+    """Description: Rerun buildings (all of them by default) on the reference class and return (building, field, lockstep, reference)
+    for every result that differs. Means are sums in a different order, so they only have to agree to rounding"""
+    results = sim.results()
+    mismatches = []
+    for building in (range(len(calls)) if buildings is None else buildings):
+        reference = reference_run(calls[building], seeds[building], sim.config)
+        for field in RESULT_FIELDS:
+            value = results[field][building].item()
+            if not math.isclose(value, reference[field], rel_tol=1e-9, abs_tol=1e-9):
+                mismatches.append((building, field, value, reference[field]))
+    return mismatches
+
+
+if __name__ == '__main__':
+    defaults = CONFIG()
+    parser = argparse.ArgumentParser(description="Simulate many independent buildings at once with the lockstep NumPy engine")
+    parser.add_argument("--buildings", type=int, default=1000)
+    parser.add_argument("--hours", type=float, default=8.0, help="simulated hours of calls per building")
+    parser.add_argument("--call-rate", type=float, default=2.0, help="calls per minute in each building")
+    parser.add_argument("--seed", type=int, default=0, help="building i uses seed + i for its calls and passengers")
+    parser.add_argument("--min-floor", type=int, default=defaults.min_floor)
+    parser.add_argument("--max-floor", type=int, default=defaults.max_floor)
+    parser.add_argument("--check", type=int, default=0, metavar="N", help="rerun the first N buildings on the Elevator class and compare")
+    args = parser.parse_args()
+
+    config = CONFIG(min_floor=args.min_floor, max_floor=args.max_floor)
+    seeds = list(range(args.seed, args.seed + args.buildings))
+    calls = building_traffic(config, args.buildings, args.seed, args.hours, args.call_rate)
+
+    start = time.perf_counter()
+    sim = LockstepSim(calls, seeds, config).run()
+    wall_seconds = time.perf_counter() - start
+
+    results = sim.results()
+    print(f"{args.buildings} buildings x {args.hours:g} hours in {wall_seconds:.2f}s ({sim.steps} steps, "
+          f"{args.buildings * args.hours / wall_seconds:.0f} building-hours per second)")
+    for field in RESULT_FIELDS[:-1]:
+        print(f"  {field:<22} mean {results[field].mean():12.2f}   min {results[field].min():12.2f}   max {results[field].max():12.2f}")
+
+    if args.check:
+        mismatches = check(sim, calls, seeds, range(min(args.check, args.buildings)))
+        for building, field, value, reference in mismatches:
+            print(f"  building {building}: {field} is {value} here but {reference} on the Elevator class")
+        print(f"Checked {min(args.check, args.buildings)} buildings against the Elevator class: "
+              f"{'all match' if not mismatches else f'{len(mismatches)} differences'}")
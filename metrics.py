@@ -0,0 +1,128 @@
+# metrics.py
+import csv
+import json
+from array import array
+from collections import Counter
+
+# Passenger latency numbers for the simulator.
+# The elevator calls these hooks (when it has a Metrics attached) with the simulated time from its clock:
+# when a call button is pressed, when passengers board and get off, every stop and every floor travelled.
+# Samples are kept in flat double arrays and only sorted when a report is asked for.
+
+PERCENTILES = (50, 95, 99)
+
+
+def attach(elevator):
+    """Description: Attach a new Metrics to an Elevator, or every car of a Bank, and return it"""
+    metrics = Metrics(elevator.clock)
+    for car in getattr(elevator, "cars", [elevator]):
+        car.metrics = metrics
+    return metrics
+
+
+def percentile(sorted_samples, percent: float) -> float:
+    """Description: Nearest rank percentile of already sorted samples (0.0 if there aren't any)"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * percent // 100)) # ceiling division
+    return sorted_samples[int(rank) - 1]
+
+
+class Metrics:
+    def __init__(self, clock):
+        self.clock = clock
+        self.wait_times = array('d') # call button pressed -> boarded
+        self.ride_times = array('d') # boarded -> got off
+        self.trip_stops = array('H') # stops made per sweep
+        self.floors_travelled = 0
+        self.door_cycles = 0
+        self.calls = 0
+        self.floor_stops = Counter() # floor -> number of times the doors opened there
+
+        self._call_times = {} # (floor, direction) -> when that call button was first pressed
+        self._board_times = {} # (car, passenger slot) -> when they boarded
+        self._stops_this_trip = Counter() # car -> stops so far in the current sweep
+
+    #### Hooks ####
+    def call_registered(self, floor: int, direction: str):
+        self.calls += 1
+        self._call_times.setdefault((floor, direction), self.clock.now)
+
+    def call_answered(self, floor: int):
+        self._call_times.pop((floor, "UP"), None)
+        self._call_times.pop((floor, "DOWN"), None)
+
+    def travelled(self, floors: int):
+        self.floors_travelled += floors
+
+    def stopped(self, car: int, floor: int):
+        self.door_cycles += 1
+        self.floor_stops[floor] += 1
+        self._stops_this_trip[car] += 1
+
+    def trip_finished(self, car: int):
+        stops = self._stops_this_trip.pop(car, 0)
+        if stops:
+            self.trip_stops.append(stops)
+
+    def boarded(self, car: int, slot: int, floor: int, rider):
+        # Each rider waited from their own press of the button (rider.called_at). Riders nobody told us about are
+        # made up when the doors open, they waited from the first press of the button for the way they're going
+        now = self.clock.now
+        called = rider.called_at
+        if called is None:
+            called = self._call_times.get((floor, "UP" if rider.destination > floor else "DOWN"))
+        if called is not None:
+            self.wait_times.append(now - called)
+        self._board_times[(car, slot)] = now
+
+    def alighted(self, car: int, slot: int):
+        boarded = self._board_times.pop((car, slot), None)
+        if boarded is not None:
+            self.ride_times.append(self.clock.now - boarded)
+
+    def evicted(self, car: int, slot: int):
+        # Kicked off for being over the weight limit. They call again and their wait starts over
+        self._board_times.pop((car, slot), None)
+
+    #### Reports ####
+    def summary(self) -> dict:
+        waits = sorted(self.wait_times)
+        rides = sorted(self.ride_times)
+        summary = {
+            "sim_seconds": self.clock.now,
+            "calls": self.calls,
+            "passengers_delivered": len(rides),
+            "floors_travelled": self.floors_travelled,
+            "door_cycles": self.door_cycles,
+            "trips": len(self.trip_stops),
+            "stops_per_trip": sum(self.trip_stops) / len(self.trip_stops) if self.trip_stops else 0.0,
+        }
+        for name, samples in (("wait", waits), ("ride", rides)):
+            summary[f"{name}_mean"] = sum(samples) / len(samples) if samples else 0.0
+            for percent in PERCENTILES:
+                summary[f"{name}_p{percent}"] = percentile(samples, percent)
+            summary[f"{name}_max"] = samples[-1] if samples else 0.0
+        summary["floor_stops"] = {floor: self.floor_stops[floor] for floor in sorted(self.floor_stops)}
+        return summary
+
+    def write_json(self, path: str):
+        with open(path, "w") as json_file:
+            json.dump(self.summary(), json_file, indent=2)
+
+    def write_csv(self, path: str):
+        """Description: One 'metric,value' row per number, the per floor histogram as floor_stops_<floor> rows"""
+        summary = self.summary()
+        floor_stops = summary.pop("floor_stops")
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(("metric", "value"))
+            writer.writerows(summary.items())
+            writer.writerows((f"floor_stops_{floor}", stops) for floor, stops in floor_stops.items())
+
+    def write(self, path: str):
+        """Description: CSV if the path ends in .csv, JSON otherwise"""
+        if path.lower().endswith(".csv"):
+            self.write_csv(path)
+        else:
+            self.write_json(path)
@@ -0,0 +1,133 @@
+# passenger_generator.py
+from bisect import bisect_right
+from random import Random
+
+# NumPy is optional. With it whole blocks of passengers are drawn as vectors, without it the same
+# distributions are drawn one value at a time with the standard library. The two produce different
+# (but each reproducible) streams for the same seed.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Random passengers by age band, inclusive on both ends
+# (first age, min weight, max weight, min height, max height) - weight in lbs, height in inches
+AGE_BANDS = (
+    (0, 0, 15, 12, 24),   # closish to how tall babies are?
+    (1, 15, 50, 20, 50),  # closish to toddler - young child height?
+    (7, 50, 120, 40, 60),
+    (15, 100, 350, 40, 90), # Not sure how many people are above 7ft - 6inches, but i'll assume a few
+)
+BAND_STARTS = [band[0] for band in AGE_BANDS]
+HEAVIEST_PASSENGER = max(band[2] for band in AGE_BANDS) # lbs, an elevator has to be able to carry them on their own
+MAX_AGE = 99 # I think it's funny some lego sets are for ages X - 99
+
+GROUP_SIZE = (1, 5) # Assuming small group of people on each floor
+
+
+class _Buffer:
+    """Description: Values drawn a block at a time and handed out a few at a time"""
+
+    def __init__(self, draw, block_size: int):
+        self.draw = draw
+        self.block_size = block_size
+        self.values = []
+        self.position = 0
+
+    def take(self, count: int) -> list:
+        if self.position + count > len(self.values):
+            self.values = self.values[self.position:] + self.draw(max(count, self.block_size))
+            self.position = 0
+        taken = self.values[self.position:self.position + count]
+        self.position += count
+        return taken
+
+
+class PassengerGenerator:
+    def __init__(self, seed=None, block_size: int = 4096, use_numpy=None):
+        """Description: One seed makes every passenger, group size and destination reproducible.
+        use_numpy=None uses NumPy when it's installed, False forces the pure Python fallback"""
+        if use_numpy and np is None:
+            raise ImportError("use_numpy=True needs numpy installed")
+        self.seed = seed
+        self.uses_numpy = np is not None if use_numpy is None else use_numpy
+        self.random = np.random.default_rng(seed) if self.uses_numpy else Random(seed)
+
+        self._riders = _Buffer(self._draw_riders, block_size)
+        self._group_sizes = _Buffer(self._draw_group_sizes, block_size)
+        self._uniforms = _Buffer(self._draw_uniforms, block_size)
+
+    #### Public Functions ####
+    def passengers(self, count: int, passenger_type=None) -> list:
+        """Description: 'count' random (age, height, weight) passengers, optionally built as passenger_type"""
+        riders = self._riders.take(count)
+        if passenger_type:
+            return [passenger_type(*rider) for rider in riders]
+        return riders
+
+    def group_size(self) -> int:
+        return self._group_sizes.take(1)[0]
+
+    def destinations(self, count: int, low: int, high: int, skip=None) -> list:
+        """Description: 'count' random floors from low to high (inclusive), never 'skip' (i.e. the floor they're on)"""
+        choices = high - low + 1
+        if skip is not None and low <= skip <= high:
+            choices -= 1
+            return [low + floor + (low + floor >= skip) for floor in (int(u * choices) for u in self._uniforms.take(count))]
+        return [low + int(u * choices) for u in self._uniforms.take(count)]
+
+    def getstate(self) -> dict:
+        """Description: Everything needed to carry on the same stream later - the RNG state and anything drawn but not handed out yet"""
+        return {
+            "seed": self.seed,
+            "uses_numpy": self.uses_numpy,
+            "block_size": self._riders.block_size,
+            "random": self.random.bit_generator.state if self.uses_numpy else self.random.getstate(),
+            "riders": self._riders.values[self._riders.position:],
+            "group_sizes": self._group_sizes.values[self._group_sizes.position:],
+            "uniforms": self._uniforms.values[self._uniforms.position:],
+        }
+
+    def setstate(self, state: dict):
+        """Description: Pick up exactly where the generator that made 'state' (see getstate) left off"""
+        if state["uses_numpy"] != self.uses_numpy:
+            self.__init__(state["seed"], state["block_size"], state["uses_numpy"])
+        if self.uses_numpy:
+            self.random.bit_generator.state = state["random"]
+        else:
+            self.random.setstate(state["random"])
+        self.seed = state["seed"]
+        for buffer, values in ((self._riders, state["riders"]), (self._group_sizes, state["group_sizes"]),
+                               (self._uniforms, state["uniforms"])):
+            buffer.block_size = state["block_size"]
+            buffer.values = list(values)
+            buffer.position = 0
+
+    #### Private functions ####
+    def _draw_riders(self, count: int) -> list:
+        if self.uses_numpy:
+            bands = np.array(AGE_BANDS)
+            ages = self.random.integers(0, MAX_AGE + 1, count)
+            band = np.searchsorted(bands[:, 0], ages, side="right") - 1
+            weights = self.random.integers(bands[band, 1], bands[band, 2] + 1)
+            heights = self.random.integers(bands[band, 3], bands[band, 4] + 1)
+            return list(zip(ages.tolist(), heights.tolist(), weights.tolist()))
+
+        riders = []
+        randint = self.random.randint
+        for _ in range(count):
+            age = randint(0, MAX_AGE)
+            _, min_weight, max_weight, min_height, max_height = AGE_BANDS[bisect_right(BAND_STARTS, age) - 1]
+            weight = randint(min_weight, max_weight)
+            riders.append((age, randint(min_height, max_height), weight))
+        return riders
+
+    def _draw_group_sizes(self, count: int) -> list:
+        if self.uses_numpy:
+            return self.random.integers(GROUP_SIZE[0], GROUP_SIZE[1] + 1, count).tolist()
+        return [self.random.randint(*GROUP_SIZE) for _ in range(count)]
+
+    def _draw_uniforms(self, count: int) -> list:
+        if self.uses_numpy:
+            return self.random.random(count).tolist()
+        return [self.random.random() for _ in range(count)]
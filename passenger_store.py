@@ -0,0 +1,255 @@
+# passenger_store.py
+from array import array
+from collections import deque
+
+# Compact store for the passengers riding in the elevator.
+# Instead of one namedtuple per rider, age/height/weight/destination live in parallel arrays and a rider is
+# just a slot number into them. Slots are linked together in boarding order so the last passenger on can be
+# found in O(1) when the elevator is over weight, and emptied slots go on a free-list to be reused by the next
+# passenger that boards.
+# Every rider is also linked into a bucket for their destination floor, so letting people off at a stop only
+# touches the riders getting off there.
+#
+# WaitingRiders is the other side of the doors - riders waiting at a hall call, queued per destination.
+
+NO_SLOT = -1
+
+
+class PassengerStore:
+    def __init__(self, passenger_type=None):
+        # passenger_type builds what gets handed back out (i.e. the PASSENGER namedtuple), defaults to plain tuples
+        self.passenger_type = passenger_type if passenger_type else (lambda age, height, weight, destination: (age, height, weight, destination))
+        self.ages = array('H')
+        self.heights = array('H')
+        self.weights = array('H')
+        self.destinations = array('i')
+        # Boarding order as a doubly linked list of slots. Free slots are chained through _next as well
+        self._next = array('i')
+        self._prev = array('i')
+        self._first = NO_SLOT
+        self._last = NO_SLOT
+        self._free = NO_SLOT
+        # Riders going to the same floor as a doubly linked list per destination. _buckets is destination -> first slot
+        self._bucket_next = array('i')
+        self._bucket_prev = array('i')
+        self._buckets = {}
+        self._count = 0
+        self.total_weight = 0 # Kept up to date on every board/alight so checking the load is O(1)
+
+    #### Public Functions ####
+    def board(self, passenger) -> int:
+        """Description: Add a passenger (age, height, weight, destination) and return the slot they're stored in"""
+        age, height, weight, destination = passenger[0], passenger[1], passenger[2], passenger[3]
+        if self._free != NO_SLOT:
+            slot = self._free
+            self._free = self._next[slot]
+            self.ages[slot] = age
+            self.heights[slot] = height
+            self.weights[slot] = weight
+            self.destinations[slot] = destination
+        else:
+            slot = len(self.ages)
+            self.ages.append(age)
+            self.heights.append(height)
+            self.weights.append(weight)
+            self.destinations.append(destination)
+            self._next.append(NO_SLOT)
+            self._prev.append(NO_SLOT)
+            self._bucket_next.append(NO_SLOT)
+            self._bucket_prev.append(NO_SLOT)
+
+        # Link onto the end of the boarding order
+        self._prev[slot] = self._last
+        self._next[slot] = NO_SLOT
+        if self._last != NO_SLOT:
+            self._next[self._last] = slot
+        else:
+            self._first = slot
+        self._last = slot
+
+        # And onto the front of their destination's bucket, order inside a bucket doesn't matter
+        bucket_first = self._buckets.get(destination, NO_SLOT)
+        self._bucket_prev[slot] = NO_SLOT
+        self._bucket_next[slot] = bucket_first
+        if bucket_first != NO_SLOT:
+            self._bucket_prev[bucket_first] = slot
+        self._buckets[destination] = slot
+
+        self._count += 1
+        self.total_weight += weight
+        return slot
+
+    def alight(self, slot: int):
+        """Description: Remove the passenger in 'slot' and return them"""
+        passenger = self.get(slot)
+
+        previous_slot, next_slot = self._bucket_prev[slot], self._bucket_next[slot]
+        if previous_slot != NO_SLOT:
+            self._bucket_next[previous_slot] = next_slot
+        elif next_slot != NO_SLOT:
+            self._buckets[self.destinations[slot]] = next_slot
+        else:
+            del self._buckets[self.destinations[slot]]
+        if next_slot != NO_SLOT:
+            self._bucket_prev[next_slot] = previous_slot
+
+        self._unlink(slot)
+        return passenger
+
+    def alight_floor(self, floor: int) -> list:
+        """Description: Everyone going to 'floor' gets off. Returns their slots, which get() can still read until the next board"""
+        slot = self._buckets.pop(floor, NO_SLOT)
+        slots = []
+        while slot != NO_SLOT:
+            slots.append(slot)
+            next_slot = self._bucket_next[slot]
+            self._unlink(slot)
+            slot = next_slot
+        return slots
+
+    def riding_to(self, floor: int) -> bool:
+        return floor in self._buckets
+
+    def destination_floors(self):
+        """Description: Every floor somebody in the elevator is going to"""
+        return self._buckets.keys()
+
+    def pop(self):
+        """Description: Remove and return the last passenger that boarded"""
+        if self._last == NO_SLOT:
+            raise IndexError("pop from an empty elevator")
+        return self.alight(self._last)
+
+    def popleft(self):
+        """Description: Remove and return the first passenger that boarded"""
+        if self._first == NO_SLOT:
+            raise IndexError("pop from an empty elevator")
+        return self.alight(self._first)
+
+    def last_slot(self) -> int:
+        """Description: Slot of the last passenger that boarded (NO_SLOT if the elevator is empty)"""
+        return self._last
+
+    def get(self, slot: int):
+        return self.passenger_type(self.ages[slot], self.heights[slot], self.weights[slot], self.destinations[slot])
+
+    def slots(self):
+        """Description: Slots in boarding order. Safe to alight the current slot while iterating"""
+        slot = self._first
+        while slot != NO_SLOT:
+            next_slot = self._next[slot]
+            yield slot
+            slot = next_slot
+
+    def getstate(self) -> dict:
+        """Description: The columns and links as they are, so a restored store hands out the same slots"""
+        return {
+            "ages": self.ages, "heights": self.heights, "weights": self.weights, "destinations": self.destinations,
+            "next": self._next, "prev": self._prev, "bucket_next": self._bucket_next, "bucket_prev": self._bucket_prev,
+            "buckets": dict(self._buckets),
+            "first": self._first, "last": self._last, "free": self._free, "count": self._count, "total_weight": self.total_weight,
+        }
+
+    def setstate(self, state: dict):
+        """Description: Load a getstate() dict. The columns can be anything array.frombytes takes (i.e. a slice of a memory map)"""
+        self.__init__(self.passenger_type)
+        for column, name in ((self.ages, "ages"), (self.heights, "heights"), (self.weights, "weights"),
+                             (self.destinations, "destinations"), (self._next, "next"), (self._prev, "prev"),
+                             (self._bucket_next, "bucket_next"), (self._bucket_prev, "bucket_prev")):
+            column.frombytes(state[name])
+        self._buckets = dict(state["buckets"])
+        self._first, self._last, self._free = state["first"], state["last"], state["free"]
+        self._count, self.total_weight = state["count"], state["total_weight"]
+
+    def clear(self):
+        self.__init__(self.passenger_type)
+
+    # Keep the deque-like interface the elevator used before
+    append = board
+
+    def __iter__(self):
+        for slot in self.slots():
+            yield self.get(slot)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    #### Private functions ####
+    def _unlink(self, slot: int):
+        # Out of the boarding order and onto the free list. Taking it out of its bucket is up to the caller
+        previous_slot, next_slot = self._prev[slot], self._next[slot]
+        if previous_slot != NO_SLOT:
+            self._next[previous_slot] = next_slot
+        else:
+            self._first = next_slot
+        if next_slot != NO_SLOT:
+            self._prev[next_slot] = previous_slot
+        else:
+            self._last = previous_slot
+
+        self._next[slot] = self._free
+        self._free = slot
+        self._count -= 1
+        self.total_weight -= self.weights[slot]
+
+
+class WaitingRiders:
+    """Description: Riders waiting at a hall call, in one queue per destination floor with each queue's total weight"""
+
+    def __init__(self, riders=()):
+        self.queues = {} # destination -> deque of riders, in the order the destinations first showed up
+        self.weights = {} # destination -> total weight of that queue
+        self._count = 0
+        self.extend(riders)
+
+    def add(self, rider):
+        """Description: Queue a rider (age, height, weight, destination)"""
+        destination = rider[3]
+        queue = self.queues.get(destination)
+        if queue is None:
+            queue = self.queues[destination] = deque()
+            self.weights[destination] = 0
+        queue.append(rider)
+        self.weights[destination] += rider[2]
+        self._count += 1
+
+    def extend(self, riders):
+        for rider in riders:
+            self.add(rider)
+
+    def board(self, room: int) -> list:
+        """Description: Take riders off the queues while the weight they add stays under 'room'.
+        Whole destination queues go first, then whoever fits from the front of the queues left over"""
+        boarding = []
+        for destination in list(self.queues):
+            if self.weights[destination] < room:
+                room -= self.weights.pop(destination)
+                boarding.extend(self.queues.pop(destination))
+
+        for destination in list(self.queues):
+            queue = self.queues[destination]
+            while queue and queue[0][2] < room:
+                rider = queue.popleft()
+                room -= rider[2]
+                self.weights[destination] -= rider[2]
+                boarding.append(rider)
+            if queue:
+                break # Nobody else fits
+            del self.queues[destination]
+            del self.weights[destination]
+
+        self._count -= len(boarding)
+        return boarding
+
+    def __iter__(self):
+        for queue in self.queues.values():
+            yield from queue
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
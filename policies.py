@@ -0,0 +1,281 @@
+# policies.py
+import argparse
+import time
+from array import array
+from functools import lru_cache
+
+from elevator import CONFIG, LOAD_BYPASS, Elevator
+from event_log import EventLog
+from floor_index import FloorSet
+from metrics import attach as attach_metrics
+from sim_clock import SimClock
+from traces import read_trace, run_trace
+
+# Scheduling policies - which floor an elevator goes to next, and which car in a bank gets a new call.
+# Without a policy the elevator answers calls in the order they came in, picking up anything on the way
+# (the original sweep in Elevator._run). With one, the policy's serve() takes over until every call is answered.
+#
+# Elevator(policy=Look(config)), Bank(4, policy=DestinationDispatch(config)) or --policy look on the command line
+#
+# python policies.py --trace calls.jsonl --cars 2   runs every policy on the same trace and prints a comparison
+
+
+class CostTable:
+    """Description: Seconds to travel and stop, worked out once per building config instead of on every decision.
+    Travel time only depends on how many floors apart two floors are, so one entry per distance covers every pair of floors"""
+
+    def __init__(self, config):
+        self.door_cycle = 2 * config.door_speed # Open and close
+        floors = config.max_floor - config.min_floor + 1
+        self.travel = array('d', (distance / config.elevator_fps for distance in range(floors)))
+
+    def travel_time(self, from_floor: int, to_floor: int) -> float:
+        return self.travel[abs(from_floor - to_floor)]
+
+
+@lru_cache(maxsize=None)
+def cost_table(config) -> CostTable:
+    """Description: The CostTable for a config, shared by every policy and car in the same building"""
+    return CostTable(config)
+
+
+class Policy:
+    name = ""
+    assigns_by_destination = False # True gives every car in a bank its own calls and waiting riders (see bank.py)
+
+    def __init__(self, config):
+        self.costs = cost_table(config)
+
+    #### Public Functions ####
+    def serve(self, car):
+        """Description: Simulation process that moves 'car' stop by stop until it has nothing left to do"""
+        trip_direction = car.request_dir
+        while True:
+            floor = self.next_stop(car)
+            if floor is None:
+                break
+            if car.metrics and trip_direction and car.request_dir != trip_direction:
+                car.metrics.trip_finished(car.car_number)
+            trip_direction = car.request_dir
+
+            if car.has_stop(floor):
+                yield from car.goto_floor(floor)
+            else:
+                yield from car.travel_to(floor)
+
+        if car.metrics:
+            car.metrics.trip_finished(car.car_number)
+        # Every call has been answered (by this car or another one in the bank), so the order they came in doesn't matter anymore
+        for floor in list(car.waiting_que):
+            car.waiting_que.discard(floor)
+
+    def next_stop(self, car):
+        """Description: The next floor 'car' should go to (setting car.request_dir to the way it's heading), or None when it's done"""
+        raise NotImplementedError
+
+    def assign_car(self, bank, floor: int, direction: str, destination=None):
+        """Description: Which car in 'bank' gets a new call. The default is the bank's closest car heading the right way"""
+        return bank.nearest_car(floor, direction)
+
+    #### Private functions ####
+    def _calls(self, car, direction: str) -> tuple:
+        """Description: The hall calls this car was given, split into (same direction as 'direction', opposite direction).
+        Both empty while the car is too full to stop for them (see Elevator.has_room)"""
+        assigned = car.assigned_calls.bits if car.has_room() else 0
+        up = FloorSet(car.config.min_floor, car.config.max_floor)
+        up.bits = car.up_calls.bits & assigned
+        down = FloorSet(car.config.min_floor, car.config.max_floor)
+        down.bits = car.down_calls.bits & assigned
+        return (up, down) if direction == "UP" else (down, up)
+
+    def _stops(self, car) -> FloorSet:
+        """Description: Every floor the car has to stop at - lit panel buttons and its hall calls (unless it's full)"""
+        assigned = car.assigned_calls.bits if car.has_room() else 0
+        stops = FloorSet(car.config.min_floor, car.config.max_floor)
+        stops.bits = car.button_lights.bits | ((car.up_calls.bits | car.down_calls.bits) & assigned)
+        return stops
+
+
+class Look(Policy):
+    """Description: Keep going one way while there are panel buttons or same direction calls ahead, turning around at
+    the last one (or at the farthest call going the other way)"""
+    name = "look"
+
+    def next_stop(self, car):
+        for _ in range(2):
+            direction = car.request_dir if car.request_dir else car.direction
+            car.request_dir = direction
+            stop = self._ahead(car, direction)
+            if stop is not None:
+                return stop
+            car.request_dir = "DOWN" if direction == "UP" else "UP"
+        return None
+
+    def _ahead(self, car, direction: str):
+        floor = car.current_floor
+        same, opposite = self._calls(car, direction)
+        ahead = car.button_lights.beyond(floor, direction)
+        ahead.update(same.beyond(floor, direction))
+        if ahead:
+            return ahead.lowest() if direction == "UP" else ahead.highest()
+
+        # Nothing more going this way, go as far as the farthest call going back the other way
+        turn = opposite.beyond(floor, direction)
+        if turn:
+            return turn.highest() if direction == "UP" else turn.lowest()
+        return None
+
+
+class Scan(Look):
+    """Description: Like LOOK, but always runs to the end of the building before turning around while there's anything left to do"""
+    name = "scan"
+
+    def _ahead(self, car, direction: str):
+        floor = car.current_floor
+        same, _ = self._calls(car, direction)
+        ahead = car.button_lights.beyond(floor, direction)
+        ahead.update(same.beyond(floor, direction))
+        if ahead:
+            return ahead.lowest() if direction == "UP" else ahead.highest()
+
+        end_floor = car.config.max_floor if direction == "UP" else car.config.min_floor
+        if floor != end_floor and self._stops(car):
+            return end_floor
+        return None
+
+
+class NearestCallFirst(Policy):
+    """Description: Always go to whichever stop is quickest to get to, in either direction"""
+    name = "nearest"
+
+    def next_stop(self, car):
+        stops = self._stops(car)
+        if not stops:
+            return None
+        floor = car.current_floor
+        above = stops.next_stop(floor, "UP")
+        below = stops.next_stop(floor, "DOWN")
+        if below is None or (above is not None and self._quicker(car, above, below)):
+            next_floor = above
+        else:
+            next_floor = below
+
+        if next_floor != floor:
+            car.request_dir = "UP" if next_floor > floor else "DOWN"
+        return next_floor
+
+    def _quicker(self, car, above: int, below: int) -> bool:
+        """Description: Whether 'above' is the better pick over 'below'. Ties keep the car going the way it was"""
+        up_time = self.costs.travel_time(car.current_floor, above)
+        down_time = self.costs.travel_time(car.current_floor, below)
+        if up_time == down_time:
+            return car.request_dir != "DOWN"
+        return up_time < down_time
+
+
+class DestinationDispatch(Look):
+    """Description: Callers say where they're going when they call (see traffic.py), so the bank hands each call to the car
+    that adds the least time for it - counting stops the car already has to make, and grouping riders going to the same floor.
+    A car works through its calls like LOOK, calls without a destination are assigned like the default bank.
+    Each caller waits for the car they were given, not whichever car answers the floor first"""
+    name = "destination"
+    assigns_by_destination = True
+
+    def assign_car(self, bank, floor: int, direction: str, destination=None):
+        if destination is None:
+            return super().assign_car(bank, floor, direction)
+        # Cars that are too full, or already have a car load waiting for them on this floor, only get a caller when
+        # they all do. Otherwise the car that already stops there always looks cheapest and everyone piles onto it
+        cars = [car for car in bank.cars if self._has_room_for(car, floor)] or bank.cars
+        return min(cars, key=lambda car: (self._added_time(car, floor, direction, destination), car.car_number))
+
+    def _has_room_for(self, car, origin: int) -> bool:
+        call = car.floors_waiting.get(origin)
+        booked = sum(call.waiting_passengers.weights.values()) if call else 0
+        return car.has_room() and booked < car.config.max_weight * LOAD_BYPASS
+
+    def _added_time(self, car, origin: int, direction: str, destination: int) -> float:
+        costs = self.costs
+        stops = self._stops(car)
+        floor = car.current_floor
+        heading = car.request_dir if car.request_dir else car.direction
+
+        # Getting to the caller - straight there if they're ahead and going the same way, otherwise via the end of this sweep
+        if car.idle or not stops:
+            pickup = costs.travel_time(floor, origin)
+        elif direction == heading and (origin >= floor if heading == "UP" else origin <= floor):
+            pickup = costs.travel_time(floor, origin) + costs.door_cycle * stops.count_between(min(floor, origin), max(floor, origin))
+        else:
+            turn_floor = stops.highest() if heading == "UP" else stops.lowest()
+            turn_floor = max(turn_floor, floor) if heading == "UP" else min(turn_floor, floor)
+            pickup = (costs.travel_time(floor, turn_floor) + costs.travel_time(turn_floor, origin)
+                      + costs.door_cycle * len(stops))
+
+        # The ride, plus any stops the car has to add. A car that already stops at both floors only costs the travel
+        ride = costs.travel_time(origin, destination) + costs.door_cycle * stops.count_between(min(origin, destination), max(origin, destination))
+        new_stops = (origin not in stops) + (destination not in stops)
+        return pickup + ride + costs.door_cycle * new_stops
+
+
+POLICIES = {policy.name: policy for policy in (Scan, Look, NearestCallFirst, DestinationDispatch)}
+
+
+def make_policy(name: str, config):
+    """Description: A policy by name (see POLICIES), or None for the default first come first served sweep"""
+    if not name or name == "default":
+        return None
+    return POLICIES[name](config)
+
+
+def compare(read_events, config=None, cars: int = 1, seed=None, names=None) -> list:
+    """Description: Run the same trace under each policy (all of them plus the default by default) and return one row per policy.
+    read_events is a function that returns a fresh iterator over the trace, it's called once per policy"""
+    config = config if config else CONFIG()
+    rows = []
+    for name in (names if names else ("default",) + tuple(POLICIES)):
+        policy = make_policy(name, config)
+        if cars > 1:
+            from bank import Bank # bank.py imports elevator.py, only needed for multi car runs
+            elevator = Bank(cars, SimClock(), seed, config, log=EventLog(echo=False), policy=policy)
+        else:
+            elevator = Elevator(SimClock(), interactive=False, seed=seed, config=config, log=EventLog(echo=False), policy=policy)
+        metrics = attach_metrics(elevator)
+
+        start = time.perf_counter()
+        run_trace(elevator, read_events())
+        wall_seconds = time.perf_counter() - start
+
+        summary = metrics.summary()
+        hours = summary["sim_seconds"] / 3600
+        rows.append({
+            "policy": name,
+            "sim_seconds": summary["sim_seconds"],
+            "delivered": summary["passengers_delivered"],
+            "delivered_per_hour": summary["passengers_delivered"] / hours if hours else 0.0,
+            "wait_mean": summary["wait_mean"],
+            "wait_p50": summary["wait_p50"],
+            "wait_p95": summary["wait_p95"],
+            "wait_p99": summary["wait_p99"],
+            "ride_p50": summary["ride_p50"],
+            "ride_p95": summary["ride_p95"],
+            "floors_travelled": summary["floors_travelled"],
+            "door_cycles": summary["door_cycles"],
+            "wall_seconds": wall_seconds,
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    defaults = CONFIG()
+    parser = argparse.ArgumentParser(description="Compare scheduling policies on the same trace")
+    parser.add_argument("--trace", metavar="FILE", required=True, help="JSONL or CSV trace (see traces.py and traffic.py)")
+    parser.add_argument("--policies", nargs="+", choices=("default",) + tuple(POLICIES), help="policies to run (all of them by default)")
+    parser.add_argument("--cars", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-floor", type=int, default=defaults.min_floor)
+    parser.add_argument("--max-floor", type=int, default=defaults.max_floor)
+    args = parser.parse_args()
+
+    from sweep import print_table # sweep.py runs jobs in worker processes, only its table printer is needed here
+    config = CONFIG(min_floor=args.min_floor, max_floor=args.max_floor)
+    print_table(compare(lambda: read_trace(args.trace), config, args.cars, args.seed, args.policies))
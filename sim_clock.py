@@ -0,0 +1,113 @@
+# sim_clock.py
+import heapq
+import time
+
+# Discrete event clock for the Elevator. Instead of sleeping for every floor and door cycle,
+# everything that takes time gets put on a priority queue and the clock just jumps to the next event.
+# A day of elevator traffic can be simulated as fast as the CPU allows.
+
+
+class Signal:
+    """Description: A process can yield a Signal to sleep until something else in the simulation calls fire()
+    (i.e. an idle elevator waiting for somebody to press a call button)"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._waiting = []
+
+    def wait(self, process):
+        """Description: Put a process to sleep on this signal right away, without a turn on the clock first"""
+        self._waiting.append(process)
+
+    def fire(self):
+        waiting, self._waiting = self._waiting, []
+        for process in waiting:
+            self.clock.schedule(0, self.clock._resume, process)
+
+
+class SimClock:
+    def __init__(self, real_time: float = 0.0):
+        self.now = 0.0 # Simulated seconds since the clock started
+        # Wall clock seconds to sleep for every simulated second
+        # 0 runs as fast as possible, 1.0 is real time for demos, 0.1 is 10x speed...
+        self.real_time = real_time
+        self._events = [] # heap of (time, sequence, callback, argument)
+        self._sequence = 0 # Tie breaker so events at the same time run in the order they were scheduled
+        self._stopped = False
+        self.events_run = 0 # Handy for measuring how fast the simulation goes
+        # Called with no arguments every time the clock moves forward (i.e. dashboard.Dashboard taking a look at the
+        # elevator). None by default, so a run nobody is watching only pays for the check
+        self.watcher = None
+
+    #### Public Functions ####
+    def schedule(self, delay: float, callback, argument=None):
+        self.schedule_at(self.now + delay, callback, argument)
+
+    def schedule_at(self, when: float, callback, argument=None):
+        heapq.heappush(self._events, (when, self._sequence, callback, argument))
+        self._sequence += 1
+
+    def process(self, generator):
+        """Description: Start a generator as a simulation process.
+        The generator yields a number of seconds to wait, or a Signal to wait on"""
+        self.schedule(0, self._resume, generator)
+
+    def process_at(self, when: float, generator):
+        """Description: process() starting at simulated time 'when' instead of right away"""
+        self.schedule_at(when, self._resume, generator)
+
+    def signal(self) -> Signal:
+        return Signal(self)
+
+    def pending(self) -> int:
+        return len(self._events)
+
+    def next_time(self):
+        """Description: Simulated time of the next event, or None if nothing is scheduled"""
+        return self._events[0][0] if self._events else None
+
+    def clear(self):
+        """Description: Drop everything scheduled. Processes that were waiting on the clock never resume"""
+        self._events = []
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self, until=None):
+        """Description: Run events in time order until there are none left, stop() is called
+        or the next event is later than 'until'"""
+        self._stopped = False
+        while self._events and not self._stopped:
+            when = self._events[0][0]
+            if until is not None and when > until:
+                break
+            _, _, callback, argument = heapq.heappop(self._events)
+            self._advance_to(when)
+            self.events_run += 1
+            if argument is None:
+                callback()
+            else:
+                callback(argument)
+
+        if until is not None and not self._stopped:
+            self._advance_to(until)
+
+    #### Private functions ####
+    def _advance_to(self, when: float):
+        if when > self.now:
+            if self.real_time > 0:
+                time.sleep((when - self.now) * self.real_time)
+            self.now = when
+            if self.watcher is not None:
+                self.watcher()
+
+    def _resume(self, process):
+        try:
+            waiting_on = next(process)
+        except StopIteration:
+            return
+
+        if isinstance(waiting_on, Signal):
+            waiting_on.wait(process)
+        else:
+            self.schedule(waiting_on, self._resume, process)
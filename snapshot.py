@@ -0,0 +1,328 @@
+# snapshot.py
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from itertools import chain
+
+from elevator import CALL, CONFIG, PASSENGER, Elevator
+from event_log import EventLog
+from metrics import attach as attach_metrics
+from passenger_store import WaitingRiders
+from passenger_generator import PassengerGenerator
+from sim_clock import SimClock
+from traces import feed_trace, read_trace
+
+# Checkpoints for long runs and "what if" branches off a mid-day state.
+# A snapshot is everything an Elevator needs to carry on exactly where it was: floor, direction, panel buttons,
+# outside calls with the passengers waiting on them, the riders and the random number generator (including the
+# values it already drew but didn't hand out yet).
+#
+# File layout: MAGIC, header size, JSON header, then the array data (passenger columns, queues...) as raw
+# native-endian bytes padded to 8 byte boundaries. Loading memory maps the file, so a Snapshot's sections are views
+# into the map and any number of worker processes can open one snapshot file sharing the same pages. restore() copies
+# them into a new Elevator though - the passenger columns with array.frombytes, the waiting riders and the random
+# number generator through lists - since the elevator changes them as it runs. Each fork pays for its own copy.
+#
+# The elevator is a generator process, and generators can't be saved mid-step. Snapshots are taken when nothing
+# is scheduled on the clock - before the elevator starts, or when it's idle waiting for calls (see run_to_checkpoint).
+
+SNAPSHOT_MAGIC = b"ELEVSNAP"
+SNAPSHOT_VERSION = 2 # 2 - riders carry their destination
+_PREFIX = struct.Struct("<8sI") # magic, header size
+_ALIGN = 8
+NO_CALL_TIME = float("nan") # call_times entry for a waiting rider with no called_at
+
+
+def snapshot(elevator, trace_time=None, next_event_time=None) -> bytes:
+    """Description: Serialize an idle (or not yet started) Elevator.
+    trace_time is how far into a trace it's been fed, so a resume knows where to pick up. next_event_time is when the
+    feeder was going to apply the next event (both come from run_to_checkpoint)"""
+    if hasattr(elevator, "cars"):
+        raise TypeError("Snapshots are for a single Elevator, not a Bank")
+    if elevator.clock.pending():
+        raise ValueError(f"Can't snapshot while {elevator.clock.pending()} events are scheduled. "
+                         "Take it before start() or once the elevator is idle (see run_to_checkpoint)")
+
+    sections = {}
+    store = elevator.passengers.getstate()
+    for name in ("ages", "heights", "weights", "destinations", "next", "prev", "bucket_next", "bucket_prev"):
+        sections[name] = store[name]
+    sections["waiting_que"] = array('i', elevator.waiting_que)
+
+    # Outside calls - which floors, which buttons (bit 1 up, bit 2 down) and who's waiting on them
+    calls = [(floor, call) for floor, call in elevator.floors_waiting.items() if call]
+    sections["call_floors"] = array('i', (floor for floor, _ in calls))
+    sections["call_buttons"] = array('B', (call.up | call.down << 1 for _, call in calls))
+    sections["call_counts"] = array('I', (len(call.waiting_passengers) for _, call in calls))
+    sections["call_passengers"] = array('i', (value for _, call in calls for p in call.waiting_passengers for value in p[:4]))
+    # When each of them pressed the button, NaN for riders that weren't stamped
+    sections["call_times"] = array('d', (NO_CALL_TIME if p.called_at is None else p.called_at
+                                         for _, call in calls for p in call.waiting_passengers))
+
+    rng = elevator.generator.getstate()
+    sections["riders"] = array('H', (value for rider in rng["riders"] for value in rider))
+    sections["group_sizes"] = array('H', rng["group_sizes"])
+    sections["uniforms"] = array('d', rng["uniforms"])
+    if rng["uses_numpy"]:
+        random_state = rng["random"] # NumPy's is a small dict of ints
+    else:
+        version, internal_state, gauss_next = rng["random"]
+        sections["random_internal"] = array('I', internal_state)
+        random_state = [version, gauss_next]
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "byteorder": sys.byteorder,
+        "time": elevator.clock.now,
+        "trace_time": trace_time,
+        "next_event_time": next_event_time,
+        "config": list(elevator.config),
+        "elevator": {
+            "current_floor": elevator.current_floor, "direction": elevator.direction, "request_dir": elevator.request_dir,
+            "doors_open": elevator.doors_open, "idle": elevator.idle, "more_calls_coming": elevator.more_calls_coming,
+            "car_number": elevator.car_number,
+        },
+        "button_lights": elevator.button_lights.bits,
+        "up_calls": elevator.up_calls.bits,
+        "down_calls": elevator.down_calls.bits,
+        "assigned_calls": elevator.assigned_calls.bits,
+        "passengers": {name: store[name] for name in ("first", "last", "free", "count", "total_weight")},
+        "buckets": list(store["buckets"].items()), # JSON keys are strings, so destination -> first slot goes as pairs
+        "generator": {"seed": rng["seed"], "uses_numpy": rng["uses_numpy"], "block_size": rng["block_size"], "random": random_state},
+        "sections": {},
+    }
+
+    data = []
+    offset = 0
+    for name, values in sections.items():
+        raw = values.tobytes()
+        header["sections"][name] = [values.typecode, offset, len(values)]
+        data.append(raw + bytes(-len(raw) % _ALIGN))
+        offset += len(data[-1])
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    header_bytes += b" " * (-(_PREFIX.size + len(header_bytes)) % _ALIGN)
+    return _PREFIX.pack(SNAPSHOT_MAGIC, len(header_bytes)) + header_bytes + b"".join(data)
+
+
+def write_snapshot(elevator, path: str, trace_time=None, next_event_time=None):
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(snapshot(elevator, trace_time, next_event_time))
+
+
+class Snapshot:
+    """Description: A loaded snapshot. Sections are views into the file's memory map (or the bytes it came from),
+    reading them doesn't copy anything. restore() copies what the new Elevator needs out of them"""
+
+    def __init__(self, buffer, mapped=None):
+        self._mapped = mapped
+        self._view = memoryview(buffer)
+        magic, header_size = _PREFIX.unpack_from(self._view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not an elevator snapshot")
+        self.header = json.loads(bytes(self._view[_PREFIX.size:_PREFIX.size + header_size]))
+        if self.header["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot version {self.header['version']} isn't supported (expected {SNAPSHOT_VERSION})")
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError(f"Snapshot was written on a {self.header['byteorder']} endian machine")
+        self._data_start = _PREFIX.size + header_size
+        self.time = self.header["time"]
+        self.trace_time = self.header["trace_time"]
+        self.next_event_time = self.header.get("next_event_time")
+        self.config = CONFIG(*self.header["config"])
+
+    def raw(self, name: str) -> memoryview:
+        """Description: The bytes of one section"""
+        typecode, offset, count = self.header["sections"][name]
+        start = self._data_start + offset
+        return self._view[start:start + count * array(typecode).itemsize]
+
+    def values(self, name: str) -> memoryview:
+        """Description: One section as typed values (i.e. view[3] is the 4th value)"""
+        return self.raw(name).cast(self.header["sections"][name][0])
+
+    def close(self):
+        self._view.release()
+        if self._mapped is not None:
+            self._mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_snapshot(path: str) -> Snapshot:
+    """Description: Memory map a snapshot file. Close it (or use it in a 'with') when done restoring"""
+    with open(path, "rb") as snapshot_file:
+        mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return Snapshot(mapped, mapped)
+
+
+def restore(source, real_time: float = 0.0, seed=None, log=None, policy=None) -> Elevator:
+    """Description: A new headless Elevator, on its own clock, in the state a snapshot was taken in.
+    source is a Snapshot, the bytes from snapshot() or a file path. Passing a seed reseeds the passengers,
+    so forks from one snapshot can play out differently. Call resume() (or resume_trace) to carry on"""
+    if isinstance(source, str):
+        with load_snapshot(source) as loaded:
+            return restore(loaded, real_time, seed, log, policy)
+    if not isinstance(source, Snapshot):
+        with Snapshot(source) as loaded:
+            return restore(loaded, real_time, seed, log, policy)
+
+    header = source.header
+    clock = SimClock(real_time=real_time)
+    clock.now = source.time
+    elevator = Elevator(clock, interactive=False, config=source.config, log=log, policy=policy)
+    for name, value in header["elevator"].items():
+        setattr(elevator, name, value)
+    elevator.button_lights.bits = header["button_lights"]
+    elevator.up_calls.bits = header["up_calls"]
+    elevator.down_calls.bits = header["down_calls"]
+    elevator.assigned_calls.bits = header["assigned_calls"]
+
+    store = dict(header["passengers"])
+    store["buckets"] = dict(header["buckets"])
+    store.update((name, source.raw(name)) for name in ("ages", "heights", "weights", "destinations", "next", "prev", "bucket_next", "bucket_prev"))
+    elevator.passengers.setstate(store)
+
+    for floor in source.values("waiting_que"):
+        elevator.waiting_que.append(floor)
+    passengers = iter(source.values("call_passengers").tolist())
+    # Snapshots from before riders were stamped don't have call_times
+    call_times = iter(source.values("call_times").tolist() if "call_times" in header["sections"] else ())
+    for floor, buttons, count in zip(source.values("call_floors"), source.values("call_buttons"), source.values("call_counts")):
+        waiting = WaitingRiders(PASSENGER(next(passengers), next(passengers), next(passengers), next(passengers),
+                                          _call_time(next(call_times, NO_CALL_TIME))) for _ in range(count))
+        elevator.floors_waiting[floor] = CALL(down=bool(buttons & 2), up=bool(buttons & 1), waiting_passengers=waiting)
+
+    rng = dict(header["generator"])
+    if not rng["uses_numpy"]:
+        version, gauss_next = rng["random"]
+        rng["random"] = (version, tuple(source.values("random_internal")), gauss_next)
+    riders = iter(source.values("riders").tolist())
+    rng["riders"] = list(zip(riders, riders, riders))
+    rng["group_sizes"] = source.values("group_sizes").tolist()
+    rng["uniforms"] = source.values("uniforms").tolist()
+    elevator.generator.setstate(rng)
+    if seed is not None:
+        elevator.generator = PassengerGenerator(seed, rng["block_size"], rng["uses_numpy"])
+
+    return elevator
+
+
+def fork(elevator, seed=None, log=None, policy=None) -> Elevator:
+    """Description: An independent copy of an idle elevator, in memory. Pass a policy to see how a different one plays out from here"""
+    return restore(snapshot(elevator), elevator.clock.real_time, seed, log, policy if policy else elevator.policy)
+
+
+def run_to_checkpoint(elevator, events, until: float) -> tuple:
+    """Description: Feed trace events and let the elevator answer them until every call up to time 'until' has been
+    answered and the car is idle with the next event still to come. Events keep coming in on time while the car catches
+    up, so the run plays out exactly like one without a checkpoint. Leaves the elevator idle for a snapshot.
+    Returns (an iterator over the rest of the trace, when its first event is due) to hand to write_snapshot and resume_trace"""
+    clock = elevator.clock
+    events = iter(events)
+    waiting_for = [] # The event the feeder is waiting on the clock to apply
+
+    def watched():
+        for event in events:
+            waiting_for[:] = [event]
+            yield event
+        waiting_for.clear()
+
+    feeder = feed_trace(elevator, watched(), finish=False)
+    clock.process(feeder)
+    if not elevator.started:
+        elevator.resume()
+
+    while clock.pending():
+        # Parked, and the only thing left on the clock is the feeder waiting for a call that comes after the checkpoint
+        if elevator.idle and clock.pending() == 1 and waiting_for and waiting_for[0].time > max(until, clock.now):
+            # The feeder already worked out when it wakes up. Resuming has to use that exact time, working it out
+            # again from a later 'now' can round differently
+            next_event_time = clock.next_time()
+            feeder.close()
+            clock.clear()
+            return chain(waiting_for, events), next_event_time
+        clock.run(until=clock.next_time())
+    return events, None
+
+
+def resume_trace(elevator, events, next_event_time=None):
+    """Description: run_trace for an elevator left idle by run_to_checkpoint, or restored from a snapshot of one.
+    Pass only what came after the checkpoint, and the next_event_time it gave so the first event lands at the same moment.
+    Without one, events at or before the current time are applied straight away"""
+    if next_event_time is None:
+        elevator.clock.process(feed_trace(elevator, events))
+    else:
+        elevator.clock.process_at(next_event_time, feed_trace(elevator, events, first_due=True))
+    if not elevator.started:
+        elevator.resume()
+    elevator.clock.run()
+    return elevator
+
+
+def check_checkpoint(trace_path: str, until: float, seed=None, config=None, policy_name="default") -> list:
+    """Description: Run a trace straight through, then again with a checkpoint at 'until' carrying on in place, and again
+    resumed from that checkpoint's snapshot. Returns (what, checkpointed, straight through) for every result that differs"""
+    from policies import make_policy # policies.py imports the elevator, only needed for the check
+    config = config if config else CONFIG()
+
+    def new_elevator():
+        return Elevator(SimClock(), interactive=False, seed=seed, config=config, log=EventLog(echo=False),
+                        policy=make_policy(policy_name, config))
+
+    straight = new_elevator()
+    straight_metrics = attach_metrics(straight)
+    resume_trace(straight, read_trace(trace_path))
+    expected = straight_metrics.summary()
+
+    checkpointed = new_elevator()
+    checkpointed_metrics = attach_metrics(checkpointed)
+    rest, next_event_time = run_to_checkpoint(checkpointed, read_trace(trace_path), until)
+    saved = snapshot(checkpointed, checkpointed.clock.now, next_event_time)
+    waits_before, rides_before = len(checkpointed_metrics.wait_times), len(checkpointed_metrics.ride_times)
+    resume_trace(checkpointed, rest, next_event_time)
+    summary = checkpointed_metrics.summary()
+    differences = [(field, summary[field], expected[field]) for field in expected if summary[field] != expected[field]]
+
+    # Nobody is waiting or riding at a checkpoint, so the resumed run's samples are the tail of the straight through ones
+    with Snapshot(saved) as loaded:
+        resumed = restore(loaded, log=EventLog(echo=False), policy=make_policy(policy_name, config))
+        trace_time, next_event_time = loaded.trace_time, loaded.next_event_time
+    resumed_metrics = attach_metrics(resumed)
+    resume_trace(resumed, (event for event in read_trace(trace_path) if event.time > trace_time), next_event_time)
+    for field, value, reference in (
+            ("resumed sim_seconds", resumed.clock.now, expected["sim_seconds"]),
+            ("resumed wait_times", resumed_metrics.wait_times, straight_metrics.wait_times[waits_before:]),
+            ("resumed ride_times", resumed_metrics.ride_times, straight_metrics.ride_times[rides_before:])):
+        if value != reference:
+            differences.append((field, value, reference))
+    return differences
+
+
+def _call_time(value: float):
+    # NaN (NO_CALL_TIME) back to None
+    return None if value != value else value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check that checkpointing a trace run doesn't change how it plays out")
+    parser.add_argument("--trace", metavar="FILE", required=True, help="JSONL or CSV trace to run")
+    parser.add_argument("--checkpoint", type=float, required=True, metavar="TIME", help="simulated time to checkpoint at")
+    parser.add_argument("--seed", type=int, help="seed for the random passengers")
+    parser.add_argument("--policy", default="default", help="scheduling policy (see policies.py)")
+    args = parser.parse_args()
+
+    differences = check_checkpoint(args.trace, args.checkpoint, args.seed, policy_name=args.policy)
+    for field, value, reference in differences:
+        if isinstance(value, array):
+            value, reference = f"{len(value)} samples", f"{len(reference)} samples"
+        print(f"  {field} is {value} checkpointed but {reference} straight through")
+    print("Checkpointed run matches the straight through run" if not differences else f"{len(differences)} differences")
+    sys.exit(1 if differences else 0)
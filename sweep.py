@@ -0,0 +1,169 @@
+# sweep.py
+import argparse
+import csv
+import itertools
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from elevator import CONFIG, Elevator, check_config
+from event_log import EventLog
+from metrics import attach as attach_metrics
+from snapshot import load_snapshot, restore, resume_trace
+from sim_clock import SimClock
+from traces import TRACE_EVENT, run_trace
+
+# Parameter sweeps. Every combination of building settings and seeds is an independent headless run,
+# so they're fanned out over a process pool (one worker per core) and the results folded into one table.
+#
+# python sweep.py --max-floor 10 25 50 --elevator-fps 1 2 3 --seeds 4 --calls 2000
+
+SWEEP_JOB = namedtuple("SweepJob", "config seed cars calls call_rate snapshot", defaults=(None,))
+# 'calls' is how many random hall calls to simulate, 'call_rate' is calls per simulated minute
+# 'snapshot' is a snapshot file to fork from instead of starting from an empty building (see snapshot.py)
+
+RESULT_FIELDS = ("sim_seconds", "wall_seconds", "calls_per_wall_second",
+                 "wait_p50", "wait_p95", "wait_p99", "ride_p50", "ride_p95", "ride_p99", "stops_per_trip")
+
+
+def random_calls(config, seed, calls: int, call_rate: float, start: float = 0.0):
+    """Description: Lazily generate 'calls' random hall calls with exponential gaps between them, the first one after 'start'"""
+    rng = random.Random(seed)
+    now = start
+    for _ in range(calls):
+        now += rng.expovariate(call_rate / 60)
+        floor = rng.randint(config.min_floor, config.max_floor)
+        yield TRACE_EVENT(now, "call", floor, rng.choice(("UP", "DOWN")), 0)
+
+
+def run_job(job: SWEEP_JOB) -> dict:
+    """Description: Run one headless simulation and return its settings and results as a flat dict"""
+    if job.snapshot:
+        # Every seed forks from the same mid-run state, the prefix isn't simulated again
+        elevator = restore(job.snapshot, seed=job.seed, log=EventLog(echo=False))
+    elif job.cars > 1:
+        from bank import Bank # bank.py imports elevator.py, keep it out of workers that don't need it
+        elevator = Bank(job.cars, SimClock(), job.seed, job.config, log=EventLog(echo=False))
+    else:
+        elevator = Elevator(SimClock(), interactive=False, seed=job.seed, config=job.config, log=EventLog(echo=False))
+    metrics = attach_metrics(elevator)
+
+    start = time.perf_counter()
+    calls = random_calls(job.config, job.seed, job.calls, job.call_rate, elevator.clock.now)
+    if job.snapshot:
+        resume_trace(elevator, calls)
+    else:
+        run_trace(elevator, calls)
+    wall_seconds = time.perf_counter() - start
+
+    result = job.config._asdict()
+    result.update(seed=job.seed, cars=job.cars, calls=job.calls, call_rate=job.call_rate)
+    result.update(sim_seconds=elevator.clock.now, wall_seconds=wall_seconds,
+                  calls_per_wall_second=job.calls / wall_seconds if wall_seconds else 0.0)
+    summary = metrics.summary()
+    result.update((field, summary[field]) for field in RESULT_FIELDS[3:])
+    return result
+
+
+def grid(settings: dict, seeds, cars=1, calls=1000, call_rate=4.0) -> list:
+    """Description: One job per combination of config settings and seed.
+    settings maps CONFIG field names to lists of values, fields left out use the defaults"""
+    names = list(settings)
+    jobs = []
+    for values in itertools.product(*(settings[name] for name in names)):
+        config = CONFIG(**dict(zip(names, values)))
+        jobs.extend(SWEEP_JOB(config, seed, cars, calls, call_rate) for seed in seeds)
+    return jobs
+
+
+def run_sweep(jobs, workers=None) -> list:
+    """Description: Run every job across a process pool (all cores by default) and return results in job order"""
+    workers = workers if workers else os.cpu_count()
+    # The namedtuples can't be pickled under their ALL CAPS names, so jobs cross over to the workers as plain tuples
+    packed = [(tuple(job.config),) + tuple(job[1:]) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_packed_job, packed, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def _run_packed_job(packed: tuple) -> dict:
+    return run_job(SWEEP_JOB(CONFIG(*packed[0]), *packed[1:]))
+
+
+def summarize(results: list) -> list:
+    """Description: Average the results of every seed that ran with the same settings"""
+    groups = {}
+    for result in results:
+        key = tuple(result[field] for field in CONFIG._fields) + (result["cars"], result["calls"], result["call_rate"])
+        groups.setdefault(key, []).append(result)
+
+    summary = []
+    for key, group in groups.items():
+        row = dict(zip(CONFIG._fields + ("cars", "calls", "call_rate"), key))
+        row["runs"] = len(group)
+        for field in RESULT_FIELDS:
+            row[field] = sum(result[field] for result in group) / len(group)
+        summary.append(row)
+    return summary
+
+
+def print_table(rows: list):
+    if not rows:
+        return
+    columns = list(rows[0])
+    cells = [[f"{row[column]:.2f}" if isinstance(row[column], float) else str(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print(" | ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    print("-+-".join("-" * width for width in widths))
+    for line in cells:
+        print(" | ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+
+def write_csv(rows: list, path: str):
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    defaults = CONFIG()
+    parser = argparse.ArgumentParser(description="Run a grid of elevator simulations across all cores")
+    parser.add_argument("--min-floor", type=int, nargs="+", default=[defaults.min_floor])
+    parser.add_argument("--max-floor", type=int, nargs="+", default=[defaults.max_floor])
+    parser.add_argument("--max-weight", type=int, nargs="+", default=[defaults.max_weight])
+    parser.add_argument("--elevator-fps", type=float, nargs="+", default=[defaults.elevator_fps])
+    parser.add_argument("--door-speed", type=float, nargs="+", default=[defaults.door_speed])
+    parser.add_argument("--seeds", type=int, default=3, help="number of seeds to run for every combination")
+    parser.add_argument("--cars", type=int, default=1)
+    parser.add_argument("--calls", type=int, default=1000, help="random hall calls per run")
+    parser.add_argument("--call-rate", type=float, default=4.0, help="hall calls per simulated minute")
+    parser.add_argument("--sample", type=int, help="only run this many randomly picked jobs from the grid")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="fork every seed from this snapshot, building settings come from the snapshot (single car only)")
+    parser.add_argument("--workers", type=int, help="worker processes (defaults to one per core)")
+    parser.add_argument("--csv", metavar="FILE", help="also write the summary table to a CSV file")
+    args = parser.parse_args()
+
+    for max_weight in args.max_weight:
+        try:
+            check_config(defaults._replace(max_weight=max_weight))
+        except ValueError as error:
+            parser.error(str(error))
+
+    settings = {"min_floor": args.min_floor, "max_floor": args.max_floor, "max_weight": args.max_weight,
+                "elevator_fps": args.elevator_fps, "door_speed": args.door_speed}
+    if args.snapshot:
+        with load_snapshot(args.snapshot) as loaded:
+            config = loaded.config
+        jobs = [SWEEP_JOB(config, seed, 1, args.calls, args.call_rate, args.snapshot) for seed in range(args.seeds)]
+    else:
+        jobs = grid(settings, range(args.seeds), args.cars, args.calls, args.call_rate)
+    if args.sample and args.sample < len(jobs):
+        jobs = random.Random(0).sample(jobs, args.sample)
+
+    summary = summarize(run_sweep(jobs, args.workers))
+    print_table(summary)
+    if args.csv:
+        write_csv(summary, args.csv)
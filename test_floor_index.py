@@ -0,0 +1,73 @@
+# test_floor_index.py
+import pytest
+
+from floor_index import CallQueue, FloorSet
+
+# FloorSet keeps floors as bit offsets from min_floor, so every check runs on a building with basements and on one
+# starting at floor 1. python -m pytest
+
+
+@pytest.fixture(params=[(-2, 10), (1, 10)], ids=["basement", "ground_floor_1"])
+def building(request):
+    return request.param
+
+
+def test_add_discard_and_contains_at_both_ends(building):
+    min_floor, max_floor = building
+    floors = FloorSet(min_floor, max_floor, (min_floor, max_floor))
+    assert min_floor in floors and max_floor in floors
+    assert min_floor - 1 not in floors and max_floor + 1 not in floors
+    assert (floors.lowest(), floors.highest()) == (min_floor, max_floor)
+    floors.discard(min_floor)
+    floors.discard(min_floor) # Not there anymore, nothing changes
+    assert list(floors) == [max_floor]
+
+
+def test_beyond_includes_the_floor_itself(building):
+    min_floor, max_floor = building
+    floors = FloorSet(min_floor, max_floor, range(min_floor, max_floor + 1, 3))
+    for floor in range(min_floor, max_floor + 1):
+        assert list(floors.beyond(floor, "UP")) == [f for f in floors if f >= floor]
+        assert list(floors.beyond(floor, "DOWN")) == [f for f in floors if f <= floor]
+
+
+def test_beyond_from_outside_the_building(building):
+    min_floor, max_floor = building
+    floors = FloorSet(min_floor, max_floor, (min_floor, max_floor))
+    assert list(floors.beyond(min_floor - 1, "UP")) == [min_floor, max_floor]
+    assert not floors.beyond(min_floor - 1, "DOWN")
+    assert list(floors.beyond(max_floor + 1, "DOWN")) == [min_floor, max_floor]
+    assert not floors.beyond(max_floor + 1, "UP")
+
+
+def test_next_stop(building):
+    min_floor, max_floor = building
+    floors = FloorSet(min_floor, max_floor, (min_floor, min_floor + 4))
+    assert floors.next_stop(min_floor, "UP") == min_floor
+    assert floors.next_stop(min_floor + 1, "UP") == min_floor + 4
+    assert floors.next_stop(min_floor + 5, "UP") is None
+    assert floors.next_stop(max_floor, "DOWN") == min_floor + 4
+    assert floors.next_stop(min_floor + 3, "DOWN") == min_floor
+    assert FloorSet(min_floor, max_floor).next_stop(min_floor, "UP") is None
+
+
+def test_count_between_clamps_to_the_building(building):
+    min_floor, max_floor = building
+    floors = FloorSet(min_floor, max_floor, (min_floor, min_floor + 1, max_floor))
+    assert floors.count_between(min_floor, max_floor) == 3
+    assert floors.count_between(min_floor - 5, max_floor + 5) == 3
+    assert floors.count_between(min_floor + 1, max_floor - 1) == 1
+    assert floors.count_between(max_floor, max_floor) == 1
+    assert floors.count_between(max_floor, min_floor) == 0
+    assert floors.count_between(max_floor + 1, max_floor + 3) == 0
+
+
+def test_call_queue_keeps_first_position():
+    queue = CallQueue((3, 5))
+    queue.append(3) # Already waiting, keeps its place
+    queue.append(1)
+    assert list(queue) == [3, 5, 1]
+    queue.discard(5)
+    queue.discard(7)
+    assert queue.popleft() == 3
+    assert list(queue) == [1]
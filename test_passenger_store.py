@@ -0,0 +1,87 @@
+# test_passenger_store.py
+from elevator import PASSENGER
+from passenger_store import NO_SLOT, PassengerStore, WaitingRiders
+
+# The store's boarding order, per destination buckets and free-list are all linked lists of slots.
+# These check the links directly instead of relying on whole simulation runs. python -m pytest
+
+
+def rider(weight: int, destination: int):
+    return PASSENGER(30, 70, weight, destination)
+
+
+def board_all(riders) -> tuple:
+    store = PassengerStore(PASSENGER)
+    return store, [store.board(r) for r in riders]
+
+
+def test_freed_slots_are_reused_last_freed_first():
+    store, slots = board_all(rider(100 + i, 5) for i in range(4))
+    store.alight(slots[1])
+    store.alight(slots[3])
+    assert store.board(rider(200, 6)) == slots[3]
+    assert store.board(rider(201, 6)) == slots[1]
+    assert store.board(rider(202, 6)) == 4 # Free-list is empty again, a new slot goes on the end
+    assert len(store) == 5
+    assert store.total_weight == 100 + 102 + 200 + 201 + 202
+
+
+def test_reused_slot_goes_to_the_end_of_the_boarding_order():
+    store, slots = board_all(rider(100, floor) for floor in (3, 4, 5))
+    store.alight(slots[0])
+    reused = store.board(rider(150, 7))
+    assert list(store.slots()) == [slots[1], slots[2], reused]
+    assert store.pop() == rider(150, 7)
+    assert store.popleft() == rider(100, 4)
+
+
+def test_alight_unlinks_from_anywhere_in_a_bucket():
+    # Buckets are built front first, so the last rider to board is at the head of the bucket
+    store, slots = board_all(rider(100 + i, 5) for i in range(5))
+    store.alight(slots[4]) # Head of the bucket
+    store.alight(slots[2]) # Middle
+    store.alight(slots[0]) # Tail
+    assert store.riding_to(5)
+    left = store.alight_floor(5)
+    assert sorted(left) == [slots[1], slots[3]]
+    assert not store.riding_to(5)
+    assert len(store) == 0 and store.total_weight == 0
+    assert store.last_slot() == NO_SLOT
+
+
+def test_alight_last_rider_in_a_bucket_removes_the_bucket():
+    store, slots = board_all((rider(100, 5), rider(120, 6)))
+    store.alight(slots[0])
+    assert list(store.destination_floors()) == [6]
+    assert store.alight_floor(5) == []
+
+
+def test_alight_floor_only_takes_that_floor():
+    store, slots = board_all(rider(100, floor) for floor in (5, 6, 5, 7, 5))
+    assert sorted(store.alight_floor(5)) == [slots[0], slots[2], slots[4]]
+    assert [store.get(slot).destination for slot in store.slots()] == [6, 7]
+    assert store.total_weight == 200
+    # The floor's slots went on the free-list and get handed out again
+    assert store.board(rider(90, 8)) in (slots[0], slots[2], slots[4])
+
+
+def test_setstate_hands_out_the_same_slots():
+    store, slots = board_all(rider(100 + i, 3 + i % 2) for i in range(6))
+    store.alight(slots[2])
+    store.alight_floor(4)
+    # Columns go back in as raw bytes, the way snapshot.restore() reads them out of the file
+    state = {name: value.tobytes() if hasattr(value, "tobytes") else value for name, value in store.getstate().items()}
+    restored = PassengerStore(PASSENGER)
+    restored.setstate(state)
+    assert list(restored.slots()) == list(store.slots())
+    assert restored.total_weight == store.total_weight
+    assert restored.board(rider(50, 9)) == store.board(rider(50, 9))
+
+
+def test_waiting_riders_board_whole_queues_then_whoever_fits():
+    waiting = WaitingRiders((rider(100, 5), rider(100, 5), rider(300, 6), rider(50, 6), rider(80, 7)))
+    # Queue 5 (200) fits whole, queue 6 (350) doesn't, queue 7 (80) does. Then the front of queue 6 doesn't fit
+    boarding = waiting.board(400)
+    assert [r.destination for r in boarding] == [5, 5, 7]
+    assert [r.weight for r in waiting] == [300, 50]
+    assert len(waiting) == 2
@@ -0,0 +1,136 @@
+# traces.py
+import csv
+import json
+import sys
+from collections import namedtuple
+
+# Headless batch mode. Hall calls and panel presses are streamed from a trace file through a chain of generators,
+# so only the event that's about to happen is ever held in memory, no matter how long the trace is.
+#
+# JSONL trace - one event per line:
+#   {"time": 12.5, "type": "call", "floor": 3, "direction": "up"}
+#   {"time": 20.0, "type": "press", "floor": 7, "car": 1}
+#   {"time": 31.0, "type": "call", "floor": 1, "destination": 9}
+# CSV trace - same fields with a header row:
+#   time,type,floor,direction,car,destination
+#   12.5,call,3,up,,
+#   20.0,press,7,,1,
+
+TRACE_EVENT = namedtuple("TraceEvent", "time type floor direction car destination", defaults=(None,))
+# 'time' is simulated seconds, 'type' is 'call' (outside button) or 'press' (internal panel)
+# 'direction' is 'UP' or 'DOWN' for calls and an empty string for presses
+# 'car' is which car in a Bank the panel press happened in (optional, defaults to 0)
+# 'destination' is the floor a caller is headed to, if the trace knows it (optional, calls can leave out 'direction' when it's there)
+
+EVENT_TYPES = ("call", "press")
+
+
+def read_trace(path: str):
+    """Description: Lazily read a JSONL or CSV trace file and yield validated, time ordered TRACE_EVENTs.
+    Use '-' to read JSONL from stdin"""
+    if path == "-":
+        yield from _check_order(_parse_rows(_jsonl_rows(sys.stdin)))
+        return
+
+    with open(path, newline="") as trace_file:
+        rows = _csv_rows(trace_file) if path.lower().endswith(".csv") else _jsonl_rows(trace_file)
+        yield from _check_order(_parse_rows(rows))
+
+
+def feed_trace(elevator, events, finish=True, first_due=False):
+    """Description: Simulation process that applies each trace event to the elevator (or Bank) when the clock reaches its time.
+    finish=False leaves the elevator waiting for more calls at the end (i.e. to take a snapshot and carry on later)
+    first_due=True applies the first event without waiting for it, for a process started when it's due (see snapshot.resume_trace)"""
+    elevator.more_calls_coming = True
+    for event in events:
+        if event.time > elevator.clock.now and not first_due:
+            yield event.time - elevator.clock.now
+        first_due = False
+
+        try:
+            if event.type == "call":
+                elevator.register_call(event.floor, event.direction, destination=event.destination)
+            else:
+                elevator.press_button(event.floor, event.car)
+        except ValueError as error:
+            # Parsing can't know how many cars or floors there are, so say which event it was
+            raise ValueError(f"trace {event.type} at {event.time}s on floor {event.floor}: {error}") from None
+
+    # Trace is finished. Let the elevator wrap up once it's out of calls
+    if finish:
+        elevator.calls_finished()
+
+
+def write_trace(events, trace_file):
+    """Description: Write TRACE_EVENTs to an open file as a JSONL trace, one line at a time so a stream of any length fits.
+    Leaves out fields that aren't set"""
+    for event in events:
+        row = {"time": event.time, "type": event.type, "floor": event.floor}
+        if event.direction:
+            row["direction"] = event.direction.lower()
+        if event.car:
+            row["car"] = event.car
+        if event.destination is not None:
+            row["destination"] = event.destination
+        trace_file.write(json.dumps(row) + "\n")
+
+
+def run_trace(elevator, events):
+    """Description: Run a headless elevator until every event in the trace has been served"""
+    elevator.clock.process(feed_trace(elevator, events))
+    elevator.move_elevator()
+    return elevator
+
+
+#### Pipeline stages ####
+
+def _jsonl_rows(lines):
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"line {line_number}: invalid JSON ({error})") from None
+
+
+def _csv_rows(lines):
+    # Line 1 is the header
+    for line_number, row in enumerate(csv.DictReader(lines), 2):
+        yield line_number, row
+
+
+def _parse_rows(rows):
+    for line_number, row in rows:
+        try:
+            event_type = str(row["type"]).strip().lower()
+            event_time = float(row["time"])
+            floor = int(row["floor"])
+            car = int(row.get("car") or 0)
+            destination = row.get("destination")
+            destination = int(destination) if destination not in (None, "") else None
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"line {line_number}: every event needs a numeric 'time' and 'floor' and a 'type', "
+                             "'car' and 'destination' must be numbers if they're given") from None
+
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"line {line_number}: event type must be one of {EVENT_TYPES}, got {event_type!r}")
+
+        direction = ""
+        if event_type == "call":
+            direction = str(row.get("direction") or "").strip().upper()
+            if not direction and destination is not None and destination != floor:
+                direction = "UP" if destination > floor else "DOWN"
+            if direction not in ("UP", "DOWN"):
+                raise ValueError(f"line {line_number}: call direction must be 'up' or 'down', got {direction!r}")
+
+        yield TRACE_EVENT(event_time, event_type, floor, direction, car, destination)
+
+
+def _check_order(events):
+    last_time = float("-inf")
+    for event_number, event in enumerate(events, 1):
+        if event.time < last_time:
+            raise ValueError(f"event {event_number}: trace must be sorted by time ({event.time} comes after {last_time})")
+        last_time = event.time
+        yield event
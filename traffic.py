@@ -0,0 +1,132 @@
+# traffic.py
+import argparse
+import heapq
+import itertools
+import sys
+from random import Random
+
+from elevator import CONFIG
+from traces import TRACE_EVENT, write_trace
+
+# Building traffic patterns as lazy streams of hall calls (TRACE_EVENTs with a destination).
+# Every stream is a generator that only draws the next call when it's asked for, and streams are combined with
+# merge(), which only ever holds one pending call per stream. So a month of traffic takes the same memory as a minute.
+#
+# python traffic.py --schedule office --days 30 --seed 1 > month.jsonl
+# python traffic.py --days 1 | python elevator.py --trace - --quiet
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+#### Trip patterns ####
+# Each one picks the (origin, destination) floors for one passenger
+
+def interfloor_trip(rng: Random, config) -> tuple:
+    origin = rng.randint(config.min_floor, config.max_floor)
+    destination = rng.randint(config.min_floor, config.max_floor - 1)
+    if destination >= origin:
+        destination += 1 # Nobody calls the elevator to go to the floor they're already on
+    return origin, destination
+
+def up_peak_trip(rng: Random, config) -> tuple:
+    # Morning rush, everybody comes in through the lobby
+    return config.min_floor, rng.randint(config.min_floor + 1, config.max_floor)
+
+def down_peak_trip(rng: Random, config) -> tuple:
+    # Evening rush, everybody heads home through the lobby
+    return rng.randint(config.min_floor + 1, config.max_floor), config.min_floor
+
+def lunch_trip(rng: Random, config) -> tuple:
+    # Two way traffic, about half the calls are people heading out to lunch and half are people coming back
+    return down_peak_trip(rng, config) if rng.random() < 0.5 else up_peak_trip(rng, config)
+
+TRIPS = {
+    "interfloor": interfloor_trip,
+    "up_peak": up_peak_trip,
+    "down_peak": down_peak_trip,
+    "lunch": lunch_trip,
+}
+
+# Daily schedules - (start hour, end hour, trip pattern, calls per minute)
+# Segments can overlap (i.e. a background of interfloor trips under the rush hours), their calls get merged.
+# Outside every segment nobody calls, which is the building's active time range.
+OFFICE_DAY = (
+    (7, 10, "up_peak", 6.0),
+    (8, 18, "interfloor", 1.0),
+    (12, 14, "lunch", 4.0),
+    (16.5, 19, "down_peak", 6.0),
+)
+ALL_DAY = ((0, 24, "interfloor", 2.0),)
+SCHEDULES = {"office": OFFICE_DAY, "all_day": ALL_DAY}
+
+
+#### Streams ####
+
+def poisson_calls(config, rate: float, trip="interfloor", seed=None, start: float = 0.0, end=None):
+    """Description: Lazily yield calls arriving as a Poisson process, 'rate' calls per minute from 'start' until 'end'
+    (forever if end is None). trip is a name from TRIPS or a function(rng, config) -> (origin, destination)"""
+    if rate <= 0:
+        return
+    rng = seed if isinstance(seed, Random) else Random(seed)
+    pick_trip = TRIPS[trip] if isinstance(trip, str) else trip
+    now = start
+    while True:
+        now += rng.expovariate(rate / 60)
+        if end is not None and now >= end:
+            return
+        origin, destination = pick_trip(rng, config)
+        yield TRACE_EVENT(now, "call", origin, "UP" if destination > origin else "DOWN", 0, destination)
+
+
+def scheduled_calls(config, schedule=OFFICE_DAY, seed=None, days=1, start_day: int = 0):
+    """Description: Lazily yield calls following a daily schedule for 'days' days (forever if days is None).
+    Every day and segment has its own seed derived from 'seed', so day N's traffic is the same whichever day the stream starts on"""
+    for first_hour, last_hour, trip, _ in schedule:
+        if not 0 <= first_hour < last_hour <= 24:
+            raise ValueError(f"Schedule hours must be within one day (0 - 24), got {first_hour} - {last_hour}")
+        if trip not in TRIPS and not callable(trip):
+            raise ValueError(f"Unknown trip pattern {trip!r}, expected one of {tuple(TRIPS)}")
+    if seed is None:
+        seed = Random().getrandbits(64)
+
+    days = itertools.count(start_day) if days is None else range(start_day, start_day + days)
+    for day in days:
+        day_start = day * DAY
+        yield from merge(*(
+            poisson_calls(config, rate, trip, Random(f"{seed}/{day}/{segment}"),
+                          day_start + first_hour * HOUR, day_start + last_hour * HOUR)
+            for segment, (first_hour, last_hour, trip, rate) in enumerate(schedule)
+        ))
+
+
+def merge(*streams):
+    """Description: Combine time ordered streams of TRACE_EVENTs into one time ordered stream"""
+    return heapq.merge(*streams, key=lambda event: event.time)
+
+
+def scaled(schedule, factor: float) -> tuple:
+    """Description: The same schedule with every rate multiplied by 'factor' (i.e. 2.0 for a busier building)"""
+    return tuple((first_hour, last_hour, trip, rate * factor) for first_hour, last_hour, trip, rate in schedule)
+
+
+if __name__ == '__main__':
+    defaults = CONFIG()
+    parser = argparse.ArgumentParser(description="Write a lazily generated traffic trace as JSONL")
+    parser.add_argument("--schedule", choices=sorted(SCHEDULES), default="office")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--start-day", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every rate in the schedule")
+    parser.add_argument("--min-floor", type=int, default=defaults.min_floor)
+    parser.add_argument("--max-floor", type=int, default=defaults.max_floor)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--out", metavar="FILE", help="write to a file instead of stdout")
+    args = parser.parse_args()
+
+    config = CONFIG(min_floor=args.min_floor, max_floor=args.max_floor)
+    calls = scheduled_calls(config, scaled(SCHEDULES[args.schedule], args.scale), args.seed, args.days, args.start_day)
+    if args.out:
+        with open(args.out, "w") as trace_file:
+            write_trace(calls, trace_file)
+    else:
+        write_trace(calls, sys.stdout)